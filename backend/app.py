@@ -1,21 +1,57 @@
 import os
+import copy
+import functools
+import hmac
+import random
+import threading
+from collections import OrderedDict, defaultdict
 from datetime import datetime, timedelta
 import time
 import json
 import hashlib
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, make_response
+from werkzeug.exceptions import BadRequest
 from flask_cors import CORS
 import joblib
 from tensorflow.keras.models import load_model
 import pandas as pd
-import yfinance as yf
+import numpy as np
 import redis
+import requests
 
-from data_loader import fetch_stock_data
+from cpu_config import configure_threads
+from data_loader import fetch_stock_data, fetch_stock_data_batch
+from data_loader import (
+    scheduler as fetch_scheduler, YF_RATE_LIMIT, YF_RATE_BURST
+)
+from fetch_scheduler import FetchError
+from model import (
+    rollout, has_dropout, stochastic_predict_fn, sample_paths, interval_bounds,
+    INTERVAL_LEVEL
+)
+from features import FeatureState, FEATURE_NAMES, WARMUP_BARS
+from response_format import (
+    negotiate_format, serialize_result, compute_etag, representation_etag,
+    etag_matches, accepts_gzip, gzip_body
+)
+from trading_calendar import (
+    EXCHANGE_TZ, previous_session, last_completed_session, next_session_close,
+    next_sessions, fetch_range
+)
+from profiling import ProfileStore, RequestProfiler
+from sharding import HashRing, load_members, rss_bytes
+from snapshot import (
+    VERSION_DIGEST_LEN, item_version, encode_version, decode_version,
+    changed_items
+)
+
+# Size TF/BLAS thread pools before the first op (no-op when gunicorn's
+# post_fork hook already did it for this worker)
+configure_threads('serving')
 
 app = Flask(__name__)
-CORS(app)
+CORS(app, expose_headers=['ETag', 'X-Profile-Id'])
 
 # Redis connection
 try:
@@ -29,45 +65,211 @@ except Exception as e:
     print(f"❌ Redis connection failed: {e}")
     redis_client = None
 
-# Simple cache for quotes to avoid hitting API too frequently
+# One Yahoo rate limit for every worker and shard node
+if redis_client:
+    fetch_scheduler.share_rate_limit(redis_client, YF_RATE_LIMIT, YF_RATE_BURST)
+
+# Shared global model (train.py --global), loaded once per worker
+GLOBAL_MODEL_PATH = os.path.join('model_artifacts', 'global_best.keras')
+GLOBAL_SCALERS_PATH = os.path.join('model_artifacts', 'global_scalers.pkl')
+GLOBAL_META_PATH = os.path.join('model_artifacts', 'global_meta.json')
+global_artifacts = {}
+
+# Streaming feature state per ticker for feature models (see features.py)
+feature_states = {}
+feature_locks = defaultdict(threading.Lock)
+
+# Loaded per-ticker models (LRU). With sharding each node only ever loads
+# the tickers it owns, so the working set fits the cache.
+MODEL_CACHE_SIZE = int(os.getenv('MODEL_CACHE_SIZE', '32'))
+model_cache = OrderedDict()
+model_cache_lock = threading.Lock()
+model_cache_stats = {'hits': 0, 'misses': 0}
+
+# Ticker-affinity sharding (see sharding.py), off unless SHARD_SELF is set.
+# Membership comes from SHARD_NODES (comma-separated base URLs) or from
+# SHARD_NODES_FILE, which is re-read whenever it changes.
+SHARD_SELF = os.getenv('SHARD_SELF')
+SHARD_NODES_FILE = os.getenv('SHARD_NODES_FILE')
+SHARD_FORWARD_HEADER = 'X-Shard-Forwarded'
+SHARD_FORWARD_TIMEOUT = 30  # seconds
+shard_state = {
+    'ring': HashRing([n for n in os.getenv('SHARD_NODES', '').split(',') if n]),
+    'mtime': None
+}
+
+# Opt-in per-request profiling (see profiling.py). PROFILE_TOKEN enables the
+# X-Profile-Token header and the admin endpoints; PROFILE_SAMPLE_RATE also
+# profiles that fraction of requests without the header. Profiles are kept
+# in Redis so any worker can serve them (per-worker memory without Redis).
+PROFILE_TF_HEADER = 'X-Profile-TF'
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_TF_DIR = os.getenv('PROFILE_TF_DIR', 'tf_profiles')
+profile_store = ProfileStore(
+    int(os.getenv('PROFILE_BUFFER_SIZE', '50')), redis_client)
+
+# Per-ticker quote cache used when Redis is unavailable
 quotes_cache = {}
-CACHE_DURATION = 30  # 30 seconds cache
-PREDICTION_CACHE_DURATION = 300  # 5 minutes for predictions
+CACHE_DURATION = 30  # 30 seconds cache for quotes
+PREDICTION_CACHE_DURATION = 300  # 5 minutes minimum for predictions
+PREDICTION_CACHE_MAX_DURATION = 24 * 3600  # re-check artifacts at least daily
+MAX_HORIZON = 60  # trading days
+# Extra sessions fetched before each window, so a missing Yahoo bar, a
+# halted ticker or an unlisted closure doesn't leave the window short
+FETCH_SLACK_SESSIONS = 5
+MAX_INTERVAL_SAMPLES = 256  # MC-dropout samples per prediction interval
 
 # Cache helper functions
 
 
-def generate_cache_key(ticker, window_size, end_date_str):
-    """Generate a unique cache key for prediction requests"""
-    key_data = f"{ticker}:{window_size}:{end_date_str}"
+def generate_cache_key(ticker, window_size, session, horizon=1, samples=0,
+                       version=None):
+    """
+    Generate a unique cache key for prediction requests.
+    `session` is the last trading session the prediction is based on, so
+    weekend/holiday/evening requests for the same data share one key.
+    Each forecast horizon (and interval sample count) is cached separately,
+    so a sampled interval is stored together with its prediction.
+    `version` (model path and mtime) makes a retrained model miss the cache.
+    """
+    key_data = f"{ticker}:{window_size}:{session.isoformat()}:{horizon}"
+    if samples:
+        key_data += f":{samples}"
+    if version:
+        key_data += f":{version[0]}:{version[1]}"
     return f"prediction:{hashlib.md5(key_data.encode()).hexdigest()}"
 
 
+def prediction_cache_ttl(versioned=True):
+    """
+    Session-keyed predictions only change when the next session closes,
+    so keep them until then (bounded by the min/max durations). Entries
+    whose key has no model version (the model lives on another shard)
+    keep the short TTL so a retrain shows up quickly.
+    """
+    if not versioned:
+        return PREDICTION_CACHE_DURATION
+    remaining = (next_session_close() - datetime.now(EXCHANGE_TZ)).total_seconds()
+    return int(max(PREDICTION_CACHE_DURATION,
+                   min(remaining, PREDICTION_CACHE_MAX_DURATION)))
+
+
 def get_cached_prediction(cache_key):
-    """Get prediction from Redis cache"""
+    """Get prediction and its ETag from Redis cache"""
     if not redis_client:
-        return None
+        return None, None
     try:
-        cached_data = redis_client.get(cache_key)
+        cached_data, etag = redis_client.mget(
+            cache_key, f"{cache_key}:etag")
         if cached_data:
-            return json.loads(cached_data)
+            return json.loads(cached_data), etag or compute_etag(cached_data)
+    except Exception as e:
+        print(f"Redis get error: {e}")
+    return None, None
+
+
+def get_cached_etag(cache_key):
+    """Get only the ETag of a cached prediction (no payload transfer)"""
+    if not redis_client:
+        return None
+    try:
+        return redis_client.get(f"{cache_key}:etag")
     except Exception as e:
         print(f"Redis get error: {e}")
     return None
 
 
-def cache_prediction(cache_key, prediction_data):
-    """Cache prediction in Redis"""
+def cache_prediction(cache_key, prediction_data, versioned=True):
+    """Cache prediction and its ETag in Redis; returns the ETag"""
+    payload = json.dumps(prediction_data, default=str, separators=(',', ':'))
+    etag = compute_etag(payload)
     if not redis_client:
-        return
+        return etag
     try:
-        redis_client.setex(
-            cache_key,
-            PREDICTION_CACHE_DURATION,
-            json.dumps(prediction_data, default=str)
-        )
+        ttl = prediction_cache_ttl(versioned)
+        pipe = redis_client.pipeline()
+        pipe.setex(cache_key, ttl, payload)
+        pipe.setex(f"{cache_key}:etag", ttl, etag)
+        pipe.execute()
     except Exception as e:
         print(f"Redis set error: {e}")
+    return etag
+
+
+def response_encoding():
+    """Content-coding chosen for this request ('gzip' or None)"""
+    if accepts_gzip(request.headers.get('Accept-Encoding')):
+        return 'gzip'
+    return None
+
+
+def not_modified(etag):
+    """304 response carrying the validator, with no body serialized"""
+    resp = Response(status=304)
+    resp.headers['ETag'] = etag
+    resp.headers['Vary'] = 'Accept, Accept-Encoding'
+    return resp
+
+
+def prediction_response(result, base_etag, fmt):
+    """Serialize a prediction in the negotiated layout and encoding"""
+    encoding = response_encoding()
+    etag = representation_etag(base_etag, fmt, encoding)
+    if etag_matches(request.headers.get('If-None-Match'), etag):
+        return not_modified(etag)
+
+    body = serialize_result(result, fmt)
+    if encoding == 'gzip':
+        body = gzip_body(body)
+    resp = Response(body, mimetype='application/json')
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+    resp.headers['ETag'] = etag
+    resp.headers['Vary'] = 'Accept, Accept-Encoding'
+    return resp
+
+
+def has_profile_token():
+    """True when the request carries the configured profiling token"""
+    # Raw environ lookup: cheaper than request.headers on the hot path
+    token = request.environ.get('HTTP_X_PROFILE_TOKEN')
+    return bool(token and PROFILE_TOKEN and
+                hmac.compare_digest(token, PROFILE_TOKEN))
+
+
+def profiled(view):
+    """
+    Profile a view when the request opts in (valid X-Profile-Token, or
+    sampled by PROFILE_SAMPLE_RATE). The report goes to `profile_store`
+    and its id is returned in X-Profile-Id. With `X-Profile-TF: 1` a
+    TensorFlow op trace is written under PROFILE_TF_DIR as well.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        # Profiling not configured: no request inspection at all
+        if PROFILE_TOKEN is None and not PROFILE_SAMPLE_RATE:
+            return view(*args, **kwargs)
+        privileged = PROFILE_TOKEN is not None and has_profile_token()
+        if not privileged and not (
+                PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE):
+            return view(*args, **kwargs)
+
+        tf_logdir = None
+        if privileged and request.headers.get(PROFILE_TF_HEADER) == '1':
+            tf_logdir = os.path.join(
+                PROFILE_TF_DIR, datetime.now().strftime('%Y%m%d-%H%M%S-%f'))
+        with RequestProfiler(tf_logdir) as profiler:
+            resp = make_response(view(*args, **kwargs))
+        profile_id = profile_store.add(profiler.entry(
+            method=request.method, path=request.path,
+            status=resp.status_code,
+            body=request.get_json(silent=True)))
+        resp.headers['X-Profile-Id'] = str(profile_id)
+        print(f"🔬 Profiled {request.path} as #{profile_id} "
+              f"({profiler.duration * 1000:.1f}ms)")
+        return resp
+    return wrapper
 
 # Health-check
 
@@ -83,83 +285,248 @@ def health():
 def ping():
     return jsonify(message='pong')
 
-# Predict endpoint: dynamically load model + scaler per ticker
+# Prediction + quote helpers shared by /api/predict, /api/quotes and /api/snapshot
 
 
-@app.route('/api/predict', methods=['POST'])
-def predict():
+def resolve_session(end_date_str):
     """
-    Expects JSON: { "ticker": "AAPL", "window": 60, "end_date": "YYYY-MM-DD" }
-    Returns JSON: { "ticker":"AAPL", "history":[{date,close},...], "prediction":123.45 }
+    Last trading session covered by a request.
+    `end_date` (YYYY-MM-DD) is exclusive, as in Yahoo downloads, so it maps
+    to the session before it; without it, the last session that has closed.
+    Future dates are clamped so a session that is still open is never used.
     """
-    start_time = time.time()
+    completed = last_completed_session()
+    if end_date_str:
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
+        return min(previous_session(end_date), completed)
+    return completed
 
-    data = request.get_json() or {}
-    ticker = data.get('ticker', 'AAPL').upper()
-    window_size = int(data.get('window', 60))
-    end_date_str = data.get('end_date')
 
-    # Determine date range
-    if end_date_str:
-        end_date = datetime.strptime(end_date_str, '%Y-%m-%d')
-    else:
-        end_date = datetime.now()
-        end_date_str = end_date.strftime('%Y-%m-%d')
-    start_date = end_date - timedelta(days=window_size * 3)
+def parse_horizon(data):
+    """Validated `horizon` (trading days) from a request body"""
+    try:
+        horizon = int(data.get('horizon', 1))
+    except (TypeError, ValueError):
+        raise BadRequest('horizon must be an integer')
+    if not 1 <= horizon <= MAX_HORIZON:
+        raise BadRequest(f'horizon must be between 1 and {MAX_HORIZON}')
+    return horizon
 
-    # Check Redis cache first
-    cache_key = generate_cache_key(ticker, window_size, end_date_str)
-    cached_result = get_cached_prediction(cache_key)
 
-    if cached_result:
-        print(f"✅ Cache hit for {ticker} - {time.time() - start_time:.3f}s")
-        return jsonify(cached_result)
+def parse_interval_samples(data):
+    """Validated `interval_samples` (0 = no interval) from a request body"""
+    try:
+        samples = int(data.get('interval_samples', 0))
+    except (TypeError, ValueError):
+        raise BadRequest('interval_samples must be an integer')
+    if not 0 <= samples <= MAX_INTERVAL_SAMPLES:
+        raise BadRequest(
+            f'interval_samples must be between 0 and {MAX_INTERVAL_SAMPLES}')
+    return samples
+
+
+def prediction_interval(sample_fn, window_arr, samples, horizon, to_prices):
+    """
+    MC-dropout band around a prediction: `samples` stochastic paths from
+    one tiled batch per step, reduced to quantiles. Returns the interval
+    for the next close and per-step (lower, upper) price arrays.
+    """
+    paths = to_prices(sample_paths(sample_fn, window_arr, samples, horizon))
+    lower, upper = interval_bounds(paths)
+    interval = {
+        "level": INTERVAL_LEVEL,
+        "samples": samples,
+        "lower": float(lower[0]),
+        "upper": float(upper[0]),
+        "width": float(upper[0] - lower[0]),
+    }
+    return interval, lower, upper
+
+
+def forecast_rows(session, prices):
+    """[{date, close}] for consecutive prices over the sessions after `session`"""
+    dates = next_sessions(session, len(prices))
+    return [
+        {"date": d.strftime('%Y-%m-%d'), "close": float(p)}
+        for d, p in zip(dates, prices)
+    ]
 
-    # Paths for this ticker - prefer .keras format for better performance
-    keras_model_path = os.path.join('model_artifacts', f"{ticker}_best.keras")
-    h5_model_path = os.path.join('model_artifacts', f"{ticker}_best.h5")
-    scaler_path = os.path.join('model_artifacts', f"{ticker}_scaler.pkl")
 
-    # Use .keras format if available (faster loading), otherwise fallback to .h5
-    if os.path.exists(keras_model_path):
-        model_path = keras_model_path
-        print(f"📈 Using optimized .keras model for {ticker}")
-    elif os.path.exists(h5_model_path):
-        model_path = h5_model_path
+def get_feature_state(ticker, window_size, session):
+    """
+    Snapshot of the streaming feature state for `ticker` up to `session`.
+    The live state only consumes bars it has not seen yet (O(1) per bar);
+    a cold start or an older `session` replays enough history to warm up.
+    """
+    with feature_locks[ticker]:
+        state = feature_states.get(ticker)
+        if (state is not None and state.history_size == window_size
+                and state.last_date is not None
+                and state.last_date.date() <= session):
+            if state.last_date.date() < session:
+                start_date = (state.last_date + timedelta(days=1)).strftime('%Y-%m-%d')
+                end_date = (session + timedelta(days=1)).strftime('%Y-%m-%d')
+                state.update_frame(fetch_stock_data(ticker, start_date, end_date))
+            return copy.deepcopy(state)
+
+        start_date, end_date = fetch_range(
+            session, window_size + WARMUP_BARS + FETCH_SLACK_SESSIONS)
+        fresh = FeatureState.from_frame(
+            fetch_stock_data(ticker, start_date, end_date), window_size)
+        if state is None or (fresh.last_date is not None and (
+                state.last_date is None or fresh.last_date > state.last_date)):
+            feature_states[ticker] = copy.deepcopy(fresh)
+        return fresh
+
+
+def run_feature_prediction(ticker, model, scaler, window_size, session, horizon,
+                           sample_fn=None, samples=0):
+    """
+    Predict with a model trained on OHLCV features (`train.py --features`).
+    Multi-day paths advance a copy of the feature state with each
+    predicted close (volume carried forward). Intervals cover the next
+    close only.
+    """
+    state = get_feature_state(ticker, window_size, session)
+    if not state.ready:
+        return None, 'Not enough data for ticker', 400
+    # A failed download leaves the state behind `session`; answering anyway
+    # would cache an old forecast under the newer session's key
+    if next_sessions(state.last_date.date(), 1)[0] <= session:
+        return None, f'Price data for {ticker} is not available yet', 503
+
+    history = [
+        {"date": d.strftime('%Y-%m-%d'), "close": float(row[0])}
+        for d, row in zip(state.dates, state.window())
+    ]
+    last_volume = state.volume.values[-1]
+    first_window = scaler.transform(state.window())[None]
+    path = []
+    for h in range(horizon):
+        window_arr = first_window if h == 0 else scaler.transform(state.window())[None]
+        pred_scaled = float(model.predict_on_batch(window_arr)[0, 0])
+        price = scaler.data_min_[0] + pred_scaled * scaler.data_range_[0]
+        path.append(price)
+        if h + 1 < horizon:
+            state.update(price, price, price, price, last_volume)
+
+    result = {
+        "ticker": ticker,
+        "history": history,
+        "prediction": float(path[0])
+    }
+    if samples:
+        result["interval"] = None
+        if sample_fn is not None:
+            result["interval"], _, _ = prediction_interval(
+                sample_fn, first_window, samples, 1,
+                lambda s: scaler.data_min_[0] + s * scaler.data_range_[0])
+    if horizon > 1:
+        result["horizon"] = horizon
+        result["forecast"] = forecast_rows(session, path)
+    return result, None, 200
+
+
+def model_version(ticker):
+    """
+    (path, mtime) of the model file serving `ticker`, or None. Prefers the
+    .keras format (faster loading) over legacy .h5.
+    """
+    for name in (f"{ticker}_best.keras", f"{ticker}_best.h5"):
+        path = os.path.join('model_artifacts', name)
+        try:
+            return os.path.abspath(path), os.path.getmtime(path)
+        except OSError:
+            continue
+    return None
+
+
+def load_ticker_model(ticker):
+    """
+    Model, scaler and feature list for `ticker` from the per-worker LRU
+    cache, (re)loaded when the model file changes on disk.
+    Returns (artifacts, error, status).
+    """
+    scaler_path = os.path.join('model_artifacts', f"{ticker}_scaler.pkl")
+    version = model_version(ticker)
+    if version is None:
+        return None, 'Model not found for ticker', 404
+    model_path = version[0]
+    if model_path.endswith('.h5'):
         print(f"⚠️  Using legacy .h5 model for {ticker} (consider optimizing)")
-    else:
-        return jsonify(error='Model not found for ticker'), 404
 
     if not os.path.exists(scaler_path):
-        return jsonify(error='Scaler not found for ticker'), 404
+        return None, 'Scaler not found for ticker', 404
+
+    with model_cache_lock:
+        cached = model_cache.get(ticker)
+        if cached and cached['version'] == version:
+            model_cache.move_to_end(ticker)
+            model_cache_stats['hits'] += 1
+            return cached, None, 200
+        model_cache_stats['misses'] += 1
 
-    # Load model & scaler on the fly
     model_load_start = time.time()
-    model = load_model(model_path, compile=False)
-    model_load_time = time.time() - model_load_start
-    print(f"⚡ Model loaded in {model_load_time:.3f}s")
-    scaler = joblib.load(scaler_path)
+    artifacts = {
+        'version': version,
+        'model': load_model(model_path, compile=False),
+        'scaler': joblib.load(scaler_path),
+        'features': None,
+    }
+    artifacts['sample_fn'] = (stochastic_predict_fn(artifacts['model'])
+                              if has_dropout(artifacts['model']) else None)
+    meta_path = os.path.join('model_artifacts', f"{ticker}_meta.json")
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            artifacts['features'] = json.load(f).get('features')
+    print(f"⚡ Model for {ticker} loaded in {time.time() - model_load_start:.3f}s")
+
+    with model_cache_lock:
+        model_cache[ticker] = artifacts
+        model_cache.move_to_end(ticker)
+        while len(model_cache) > MODEL_CACHE_SIZE:
+            model_cache.popitem(last=False)
+    return artifacts, None, 200
+
+
+def run_prediction(ticker, window_size, session, horizon=1, samples=0):
+    """
+    Load model + scaler for `ticker`, fetch the `window_size` bars ending at
+    `session` and predict the next close (or a `horizon`-day path).
+    With `samples`, adds an MC-dropout prediction interval ("interval" is
+    null for models trained without dropout).
+    Returns (result, error, status); `result` is None when `error` is set.
+    """
+    start_date, end_date = fetch_range(
+        session, window_size + FETCH_SLACK_SESSIONS)
+
+    artifacts, error, status = load_ticker_model(ticker)
+    if error:
+        return None, error, status
+    model, scaler = artifacts['model'], artifacts['scaler']
+
+    if artifacts['features'] == FEATURE_NAMES:
+        return run_feature_prediction(
+            ticker, model, scaler, window_size, session, horizon,
+            artifacts['sample_fn'], samples)
 
     # Fetch & preprocess
-    df = fetch_stock_data(
-        ticker,
-        start_date.strftime('%Y-%m-%d'),
-        end_date.strftime('%Y-%m-%d')
-    )
+    df = fetch_stock_data(ticker, start_date, end_date)
     # Flatten MultiIndex if present
     if isinstance(df.columns, pd.MultiIndex):
         df.columns = df.columns.get_level_values(0)
 
     if 'Close' not in df.columns or len(df) < window_size:
-        return jsonify(error='Not enough data for ticker'), 400
+        return None, 'Not enough data for ticker', 400
 
     close_prices = df['Close'].values.reshape(-1, 1)
     scaled = scaler.transform(close_prices)
     window_arr = scaled[-window_size:].reshape(1, window_size, 1)
 
-    # Predict & inverse‐scale
-    pred_scaled = model.predict(window_arr)
-    prediction = float(scaler.inverse_transform(pred_scaled)[0, 0])
+    # Predict (rolling forward for multi-day horizons) & inverse‐scale
+    pred_scaled = rollout(model.predict_on_batch, window_arr, horizon)
+    path = scaler.inverse_transform(pred_scaled.reshape(-1, 1))[:, 0]
+    prediction = float(path[0])
 
     # Build history payload
     hist_df = df[['Close']].tail(window_size)
@@ -168,18 +535,485 @@ def predict():
         for idx, val in zip(hist_df.index, hist_df['Close'])
     ]
 
-    # Prepare result for caching and response
     result = {
         "ticker": ticker,
         "history": history,
         "prediction": prediction
     }
+    bands = None
+    if samples:
+        result["interval"] = None
+        if artifacts['sample_fn'] is not None:
+            result["interval"], *bands = prediction_interval(
+                artifacts['sample_fn'], window_arr, samples, horizon,
+                lambda s: scaler.inverse_transform(
+                    s.reshape(-1, 1)).reshape(s.shape))
+    if horizon > 1:
+        result["horizon"] = horizon
+        result["forecast"] = forecast_rows(session, path)
+        if bands:
+            for row, lower, upper in zip(result["forecast"], *bands):
+                row["lower"], row["upper"] = float(lower), float(upper)
+    return result, None, 200
+
+
+def shard_ring():
+    """
+    Current shard ring, reloading membership from SHARD_NODES_FILE when the
+    file changes. Models for tickers this node no longer owns are released.
+    """
+    if SHARD_NODES_FILE and os.path.exists(SHARD_NODES_FILE):
+        mtime = os.path.getmtime(SHARD_NODES_FILE)
+        if shard_state['mtime'] != mtime:
+            ring = HashRing(load_members(SHARD_NODES_FILE))
+            with model_cache_lock:
+                released = [t for t in model_cache
+                            if ring.node_for(t) not in (None, SHARD_SELF)]
+                for t in released:
+                    del model_cache[t]
+            shard_state.update(ring=ring, mtime=mtime)
+            print(f"🔀 Shard members {ring.nodes} - released {len(released)} models")
+    return shard_state['ring']
+
+
+def shard_owner(ticker):
+    """
+    Base URL of the node that should serve `ticker`, or None when this node
+    serves it (sharding off, we own it, or the request was already forwarded).
+    """
+    if not SHARD_SELF or request.headers.get(SHARD_FORWARD_HEADER):
+        return None
+    owner = shard_ring().node_for(ticker)
+    return None if owner in (None, SHARD_SELF) else owner
+
+
+def forward_prediction(owner, ticker, window_size, session, horizon, samples=0):
+    """
+    Run a prediction on the owning node. Returns (result, error, status),
+    or None when the owner is unreachable.
+    """
+    payload = {
+        "ticker": ticker,
+        "window": window_size,
+        # end_date is exclusive: the day after pins the same session
+        "end_date": (session + timedelta(days=1)).isoformat(),
+        "horizon": horizon,
+        "interval_samples": samples,
+    }
+    try:
+        resp = requests.post(
+            f"{owner}/api/predict", json=payload,
+            headers={SHARD_FORWARD_HEADER: SHARD_SELF},
+            timeout=SHARD_FORWARD_TIMEOUT)
+        body = resp.json()
+    except (requests.RequestException, ValueError) as e:
+        print(f"❌ Shard {owner} unavailable for {ticker}: {e}")
+        return None
+    if resp.status_code != 200:
+        return None, body.get('error', 'Prediction failed'), resp.status_code
+    return body, None, 200
+
+
+def compute_prediction(ticker, window_size, session, horizon=1, samples=0):
+    """
+    run_prediction on the node owning `ticker`: forwarded when another shard
+    owns it, local otherwise (or when the owner is down).
+    """
+    owner = shard_owner(ticker)
+    if owner:
+        forwarded = forward_prediction(
+            owner, ticker, window_size, session, horizon, samples)
+        if forwarded:
+            print(f"🔀 {ticker} served by shard {owner}")
+            return forwarded
+    return run_prediction(ticker, window_size, session, horizon, samples)
+
+
+def build_quote(ticker, closes):
+    """Turn the last two closes into a { ticker, price, change, percent } row"""
+    current = float(closes[-1])
+
+    # Calculate change if we have at least 2 days of data
+    if len(closes) >= 2:
+        prev = float(closes[-2])
+        change = current - prev
+        percent = (change / prev * 100) if prev != 0 else 0
+    else:
+        change = 0.0
+        percent = 0.0
+
+    return {
+        "ticker": ticker,
+        "price": round(current, 2),
+        "change": round(change, 2),
+        "percent": round(percent, 2)
+    }
+
+
+def download_quotes(tickers):
+    """Download the latest two daily closes for `tickers` and build quote rows"""
+    results = []
+    if not tickers:
+        return results
+
+    # One batched download through the shared scheduler; it retries with
+    # backoff itself, so there is no per-ticker fallback to multiply requests
+    try:
+        frames = fetch_scheduler.fetch_many(tickers, period='2d')
+    except FetchError as e:
+        print(f"Error downloading data: {e}")
+        return results
+
+    for t in tickers:
+        try:
+            closes = frames[t]['Close'].dropna().values
+            if len(closes) < 1:
+                print(f"No data for {t}")
+                continue
+
+            results.append(build_quote(t, closes))
+        except Exception as e:
+            print(f"Error processing {t}: {e}")
+            continue
+
+    return results
+
+
+def quote_cache_key(ticker):
+    return f"quote:{ticker}"
+
+
+def get_cached_quotes(tickers):
+    """Fresh cached quotes for `tickers` as { ticker: quote }"""
+    if redis_client:
+        try:
+            values = redis_client.mget([quote_cache_key(t) for t in tickers])
+            return {t: json.loads(v) for t, v in zip(tickers, values) if v}
+        except Exception as e:
+            print(f"Redis get error: {e}")
+            return {}
+
+    current_time = time.time()
+    found = {}
+    for t in tickers:
+        if t in quotes_cache:
+            quote, timestamp = quotes_cache[t]
+            if current_time - timestamp < CACHE_DURATION:
+                found[t] = quote
+    return found
+
+
+def cache_quotes(quote_rows):
+    """Cache quote rows per ticker (Redis when available, else in-process)"""
+    if not quote_rows:
+        return
+    if redis_client:
+        try:
+            pipe = redis_client.pipeline()
+            for q in quote_rows:
+                pipe.setex(quote_cache_key(q['ticker']),
+                           CACHE_DURATION, json.dumps(q))
+            pipe.execute()
+        except Exception as e:
+            print(f"Redis set error: {e}")
+        return
+
+    current_time = time.time()
+    for q in quote_rows:
+        quotes_cache[q['ticker']] = (q, current_time)
+
+
+def get_quotes(tickers, cached=None):
+    """
+    Quotes for `tickers` in request order. Cached entries are reused and
+    the rest are fetched in one batch download. `cached` lets callers pass
+    a lookup they already made.
+    """
+    if cached is None:
+        cached = get_cached_quotes(tickers)
+    missing = [t for t in tickers if t not in cached]
+    fresh = download_quotes(missing)
+    cache_quotes(fresh)
+
+    by_ticker = dict(cached)
+    by_ticker.update({q['ticker']: q for q in fresh})
+    return [by_ticker[t] for t in tickers if t in by_ticker]
+
+
+def read_snapshot_state(tickers, pred_keys):
+    """
+    Read cached quotes and predictions for a snapshot in one Redis pipeline.
+    Returns ({ ticker: quote }, { ticker: (result, etag) }).
+    """
+    if not redis_client:
+        return get_cached_quotes(tickers), {}
+
+    pred_tickers = list(pred_keys)
+    keys = [quote_cache_key(t) for t in tickers]
+    for t in pred_tickers:
+        keys += [pred_keys[t], f"{pred_keys[t]}:etag"]
+    if not keys:
+        return {}, {}
+
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys:
+            pipe.get(key)
+        values = pipe.execute()
+    except Exception as e:
+        print(f"Redis get error: {e}")
+        return {}, {}
+
+    quote_values, pred_values = values[:len(tickers)], values[len(tickers):]
+    cached_quotes = {
+        t: json.loads(v) for t, v in zip(tickers, quote_values) if v
+    }
+    cached_preds = {}
+    for i, t in enumerate(pred_tickers):
+        payload, etag = pred_values[2 * i], pred_values[2 * i + 1]
+        if payload:
+            cached_preds[t] = (json.loads(payload),
+                               etag or compute_etag(payload))
+    return cached_quotes, cached_preds
+
+
+def load_global_artifacts():
+    """
+    (model, scalers, meta) of the global model, reloaded when the model file
+    changes on disk. Returns None when no global model has been trained.
+    """
+    paths = (GLOBAL_MODEL_PATH, GLOBAL_SCALERS_PATH, GLOBAL_META_PATH)
+    if not all(os.path.exists(p) for p in paths):
+        return None
+    mtime = os.path.getmtime(GLOBAL_MODEL_PATH)
+    if global_artifacts.get('mtime') != mtime:
+        load_start = time.time()
+        with open(GLOBAL_META_PATH) as f:
+            meta = json.load(f)
+        global_artifacts.update(
+            mtime=mtime,
+            model=load_model(GLOBAL_MODEL_PATH, compile=False),
+            scalers=joblib.load(GLOBAL_SCALERS_PATH),
+            meta=meta,
+            ids={t: i for i, t in enumerate(meta['tickers'])},
+        )
+        print(f"⚡ Global model loaded in {time.time() - load_start:.3f}s")
+    return global_artifacts
+
+
+def run_global_prediction(tickers, session, horizon=1):
+    """
+    Score `tickers` with the global model in one batched forward pass per
+    forecast step (`horizon` passes in total, whatever the ticker count).
+    Returns (result, error, status); tickers the model does not know or
+    without enough data are listed under "missing".
+    """
+    artifacts = load_global_artifacts()
+    if artifacts is None:
+        return None, 'Global model not found', 404
+
+    window_size = artifacts['meta']['window']
+    known = [t for t in tickers if t in artifacts['ids']]
+    missing = [t for t in tickers if t not in artifacts['ids']]
+
+    start_date, end_date = fetch_range(
+        session, window_size + FETCH_SLACK_SESSIONS)
+    frames = fetch_stock_data_batch(known, start_date, end_date)
+
+    scored, windows, last_rows = [], [], []
+    for t in known:
+        df = frames.get(t)
+        if df is None or len(df) < window_size:
+            missing.append(t)
+            continue
+        closes = df['Close'].values[-window_size:].reshape(-1, 1)
+        windows.append(artifacts['scalers'][t].transform(closes))
+        last_rows.append((df.index[-1].strftime('%Y-%m-%d'), float(closes[-1, 0])))
+        scored.append(t)
+
+    predictions = {}
+    if scored:
+        X = np.stack(windows)
+        ids = np.array([artifacts['ids'][t] for t in scored], dtype=np.int32)
+        model = artifacts['model']
+        pred_scaled = rollout(
+            lambda w: model.predict_on_batch({'window': w, 'ticker': ids}),
+            X, horizon)
+        data_min = np.array([artifacts['scalers'][t].data_min_[0] for t in scored])
+        data_range = np.array([artifacts['scalers'][t].data_range_[0] for t in scored])
+        paths = data_min[:, None] + pred_scaled * data_range[:, None]
+        for t, path, (date, close) in zip(scored, paths, last_rows):
+            predictions[t] = {
+                "prediction": float(path[0]), "last_date": date, "last_close": close
+            }
+            if horizon > 1:
+                predictions[t]["forecast"] = [float(p) for p in path]
+
+    result = {
+        "window": window_size,
+        "session": session.isoformat(),
+        "predictions": predictions,
+        "missing": missing
+    }
+    if horizon > 1:
+        result["horizon"] = horizon
+        result["forecast_dates"] = [
+            d.strftime('%Y-%m-%d') for d in next_sessions(session, horizon)]
+    return result, None, 200
+
+
+# Shard membership and per-node model cache stats
+@app.route('/api/shard')
+def shard():
+    ring = shard_ring()
+    with model_cache_lock:
+        hits, misses = model_cache_stats['hits'], model_cache_stats['misses']
+        models = list(model_cache)
+    return jsonify(
+        node=SHARD_SELF,
+        nodes=ring.nodes,
+        models=models,
+        model_cache={
+            "size": len(models),
+            "capacity": MODEL_CACHE_SIZE,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        },
+        rss_bytes=rss_bytes(),
+    )
+
+
+# Captured request profiles (requires X-Profile-Token)
+@app.route('/api/admin/profiles')
+def list_profiles():
+    if not has_profile_token():
+        return jsonify(error='Forbidden'), 403
+    return jsonify(profiles=profile_store.summaries())
+
+
+@app.route('/api/admin/profiles/<int:profile_id>')
+def get_profile(profile_id):
+    if not has_profile_token():
+        return jsonify(error='Forbidden'), 403
+    entry = profile_store.get(profile_id)
+    if entry is None:
+        return jsonify(error='Profile not found'), 404
+    return jsonify(entry)
+
+
+# Predict endpoint: dynamically load model + scaler per ticker
+
+
+@app.route('/api/predict', methods=['POST'])
+@profiled
+def predict():
+    """
+    Expects JSON: { "ticker": "AAPL", "window": 60, "end_date": "YYYY-MM-DD",
+                    "horizon": 1 }
+    Returns JSON: { "ticker":"AAPL", "history":[{date,close},...], "prediction":123.45 }
+    With "horizon" > 1 the result also has "forecast":[{date,close},...] for the
+    next `horizon` trading days (rolled forward on the server).
+    With "interval_samples": K (1-256) the result also has "interval":
+    {level, samples, lower, upper, width} from K MC-dropout samples, and
+    forecast rows get "lower"/"upper".
+
+    Optional `"format": "columnar"`
+    (or `Accept: application/vnd.stockpredictor.columnar+json`) returns
+    { "ticker", "dates":[...], "closes":[...], "prediction" } instead.
+    Responses carry a strong ETag; a matching `If-None-Match` yields 304.
+    """
+    start_time = time.time()
+
+    data = request.get_json() or {}
+    ticker = data.get('ticker', 'AAPL').upper()
+    window_size = int(data.get('window', 60))
+    horizon = parse_horizon(data)
+    samples = parse_interval_samples(data)
+    fmt = negotiate_format(data, request.headers.get('Accept'))
+
+    # Anchor on the last completed trading session
+    session = resolve_session(data.get('end_date'))
+
+    # Check Redis cache first
+    version = model_version(ticker)
+    cache_key = generate_cache_key(
+        ticker, window_size, session, horizon, samples, version)
+
+    # Revalidation: answer 304 from the stored ETag alone
+    if request.headers.get('If-None-Match'):
+        base_etag = get_cached_etag(cache_key)
+        if base_etag:
+            etag = representation_etag(base_etag, fmt, response_encoding())
+            if etag_matches(request.headers.get('If-None-Match'), etag):
+                print(
+                    f"✅ Not modified for {ticker} - {time.time() - start_time:.3f}s")
+                return not_modified(etag)
+
+    cached_result, base_etag = get_cached_prediction(cache_key)
+
+    if cached_result:
+        print(f"✅ Cache hit for {ticker} - {time.time() - start_time:.3f}s")
+        return prediction_response(cached_result, base_etag, fmt)
+
+    result, error, status = compute_prediction(
+        ticker, window_size, session, horizon, samples)
+    if error:
+        return jsonify(error=error), status
 
     # Cache the result
-    cache_prediction(cache_key, result)
+    base_etag = cache_prediction(cache_key, result, version is not None)
 
     print(
         f"🔥 Cache miss for {ticker} - computed in {time.time() - start_time:.3f}s")
+    return prediction_response(result, base_etag, fmt)
+
+
+# Universe scoring with the shared global model
+@app.route('/api/predict/universe', methods=['POST'])
+@profiled
+def predict_universe():
+    """
+    Expects JSON: { "tickers": ["AAPL","MSFT",...], "end_date": "YYYY-MM-DD",
+                    "horizon": 1 }
+    (omit "tickers" to score every ticker the global model was trained on)
+    Returns JSON: {
+      "window": 60, "session": "YYYY-MM-DD",
+      "predictions": { "AAPL": {prediction,last_date,last_close}, ... },
+      "missing": [...]
+    }
+    With "horizon" > 1 each prediction also has "forecast":[...] aligned
+    with the top-level "forecast_dates".
+    """
+    start_time = time.time()
+
+    data = request.get_json() or {}
+    artifacts = load_global_artifacts()
+    if artifacts is None:
+        return jsonify(error='Global model not found'), 404
+
+    tickers = [t.upper() for t in data.get('tickers') or artifacts['meta']['tickers']]
+    session = resolve_session(data.get('end_date'))
+    horizon = parse_horizon(data)
+    # The model's mtime invalidates cached scores after `train.py --global`
+    cache_key = generate_cache_key(
+        'universe:' + ','.join(sorted(tickers)), artifacts['meta']['window'],
+        session, horizon, version=(GLOBAL_MODEL_PATH, artifacts['mtime']))
+
+    cached_result, _ = get_cached_prediction(cache_key)
+    if cached_result:
+        print(f"✅ Cache hit for universe ({len(tickers)}) - "
+              f"{time.time() - start_time:.3f}s")
+        return jsonify(cached_result)
+
+    result, error, status = run_global_prediction(tickers, session, horizon)
+    if error:
+        return jsonify(error=error), status
+    cache_prediction(cache_key, result)
+
+    print(
+        f"🌐 Scored {len(result['predictions'])} tickers in one pass - "
+        f"{time.time() - start_time:.3f}s")
     return jsonify(result)
 
 
@@ -195,114 +1029,80 @@ def quotes():
     """
     data = request.get_json() or {}
     tickers = data.get('tickers', [])
-    results = []
+    return jsonify(get_quotes(tickers))
 
-    # Check cache first
-    cache_key = ','.join(sorted(tickers))
-    current_time = time.time()
 
-    if cache_key in quotes_cache:
-        cached_data, timestamp = quotes_cache[cache_key]
-        if current_time - timestamp < CACHE_DURATION:
-            return jsonify(cached_data)
+# Dashboard snapshot: quotes + predictions in one round trip
+@app.route('/api/snapshot', methods=['POST'])
+@profiled
+def snapshot():
+    """
+    Expects JSON: {
+      "tickers": ["AAPL","MSFT",...],   # quotes watchlist
+      "predict": ["AAPL"],              # tickers to predict
+      "window": 60, "end_date": "YYYY-MM-DD", "horizon": 1,
+      "interval_samples": 0, "since": "<version>"
+    }
+    Returns JSON: {
+      "version": "<token>", "delta": true|false,
+      "quotes": [ {ticker,price,change,percent}, ... ],
+      "predictions": { "AAPL": {ticker,history,prediction} | {error}, ... }
+    }
+    With `since`, only items that changed after that version are returned.
+    """
+    start_time = time.time()
 
-    # Download all tickers at once for better performance
-    try:
-        # Join tickers with space for yfinance batch download
-        tickers_str = ' '.join(tickers)
-        hist = yf.download(
-            tickers_str, period='2d', interval='1d',
-            auto_adjust=True, progress=False,
-            group_by='ticker', threads=True
-        )
+    data = request.get_json() or {}
+    tickers = [t.upper() for t in data.get('tickers', [])]
+    predict_tickers = [t.upper() for t in data.get('predict', [])]
+    window_size = int(data.get('window', 60))
+    horizon = parse_horizon(data)
+    samples = parse_interval_samples(data)
+    session = resolve_session(data.get('end_date'))
 
-        for t in tickers:
-            try:
-                # Handle single ticker vs multiple tickers response format
-                if len(tickers) == 1:
-                    ticker_data = hist
-                else:
-                    ticker_data = hist[t] if t in hist.columns.get_level_values(
-                        0) else None
-
-                if ticker_data is None or ticker_data.empty:
-                    print(f"No data for {t}")
-                    continue
-
-                # Get Close column
-                if 'Close' not in ticker_data.columns:
-                    print(f"No Close data for {t}")
-                    continue
-
-                closes = ticker_data['Close'].dropna().values
-                if len(closes) < 1:
-                    print(f"Insufficient data for {t}")
-                    continue
-
-                current = float(closes[-1])
-
-                # Calculate change if we have at least 2 days of data
-                if len(closes) >= 2:
-                    prev = float(closes[-2])
-                    change = current - prev
-                    percent = (change / prev * 100) if prev != 0 else 0
-                else:
-                    change = 0.0
-                    percent = 0.0
-
-                results.append({
-                    "ticker": t,
-                    "price": round(current, 2),
-                    "change": round(change, 2),
-                    "percent": round(percent, 2)
-                })
-            except Exception as e:
-                print(f"Error processing {t}: {e}")
-                continue
+    model_versions = {t: model_version(t) for t in predict_tickers}
+    pred_keys = {
+        t: generate_cache_key(t, window_size, session, horizon, samples,
+                              model_versions[t])
+        for t in predict_tickers
+    }
+    cached_quotes, cached_preds = read_snapshot_state(tickers, pred_keys)
 
-    except Exception as e:
-        print(f"Error downloading data: {e}")
-        # Fallback to individual downloads if batch fails
-        for t in tickers:
-            try:
-                hist = yf.download(
-                    t, period='2d', interval='1d',
-                    auto_adjust=True, progress=False
-                )
-
-                if hasattr(hist.columns, 'nlevels') and hist.columns.nlevels > 1:
-                    hist.columns = hist.columns.get_level_values(0)
-
-                if 'Close' not in hist.columns or hist.empty:
-                    continue
-
-                closes = hist['Close'].values
-                if len(closes) < 1:
-                    continue
-
-                current = float(closes[-1])
-
-                if len(closes) >= 2:
-                    prev = float(closes[-2])
-                    change = current - prev
-                    percent = (change / prev * 100) if prev != 0 else 0
-                else:
-                    change = 0.0
-                    percent = 0.0
-
-                results.append({
-                    "ticker": t,
-                    "price": round(current, 2),
-                    "change": round(change, 2),
-                    "percent": round(percent, 2)
-                })
-            except Exception:
-                continue
+    quote_rows = get_quotes(tickers, cached=cached_quotes)
+    versions = {
+        f"q:{q['ticker']}": item_version(q) for q in quote_rows
+    }
 
-    # Cache the results
-    quotes_cache[cache_key] = (results, current_time)
+    predictions = {}
+    for t in predict_tickers:
+        result, base_etag = cached_preds.get(t, (None, None))
+        if result is None:
+            result, error, _ = compute_prediction(
+                t, window_size, session, horizon, samples)
+            if error:
+                result = {"error": error}
+                base_etag = item_version(result)
+            else:
+                base_etag = cache_prediction(pred_keys[t], result,
+                                             model_versions[t] is not None)
+        predictions[t] = result
+        versions[f"p:{t}"] = base_etag[:VERSION_DIGEST_LEN]
 
-    return jsonify(results)
+    since = decode_version(data.get('since'))
+    changed = changed_items(versions, since)
+
+    response = {
+        "version": encode_version(versions),
+        "delta": bool(since),
+        "quotes": [q for q in quote_rows if f"q:{q['ticker']}" in changed],
+        "predictions": {
+            t: p for t, p in predictions.items() if f"p:{t}" in changed
+        }
+    }
+    print(
+        f"📦 Snapshot {len(tickers)} quotes / {len(predict_tickers)} predictions, "
+        f"{len(changed)} changed - {time.time() - start_time:.3f}s")
+    return jsonify(response)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,100 @@
+"""
+Compare prediction cache hit rates for raw end-date keys (before) and
+trading-session keys (after) over a simulated request stream, and the
+calendar days fetched per cache miss.
+
+Usage (from backend/):
+    python -m benchmarks.bench_cache_keys --days 28 --requests 20000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+
+from app import (
+    FETCH_SLACK_SESSIONS, PREDICTION_CACHE_DURATION,
+    PREDICTION_CACHE_MAX_DURATION
+)
+from trading_calendar import (
+    EXCHANGE_TZ, last_completed_session, next_session_close, fetch_range
+)
+
+TICKERS = ['AAPL', 'MSFT', 'GOOGL', 'TSLA', 'AMZN',
+           'NVDA', 'META', 'NFLX', 'JPM', 'BAC']
+
+
+def hit_rate(stream, key_fn, ttl_fn):
+    """Replay `stream` against a TTL cache keyed by `key_fn`."""
+    expires = {}
+    hits = 0
+    for now, ticker, window in stream:
+        key = key_fn(now, ticker, window)
+        ts = now.timestamp()
+        if expires.get(key, 0) > ts:
+            hits += 1
+        else:
+            expires[key] = ts + ttl_fn(now)
+    return hits / len(stream)
+
+
+def fixed_ttl(now):
+    return PREDICTION_CACHE_DURATION
+
+
+def session_ttl(now):
+    """Mirror of app.prediction_cache_ttl for a simulated `now`."""
+    remaining = (next_session_close(now) - now).total_seconds()
+    return max(PREDICTION_CACHE_DURATION,
+               min(remaining, PREDICTION_CACHE_MAX_DURATION))
+
+
+def raw_key(now, ticker, window):
+    return (ticker, window, now.strftime('%Y-%m-%d'))
+
+
+def session_key(now, ticker, window):
+    return (ticker, window, last_completed_session(now))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--days', type=int, default=28)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--window', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    start = datetime(2024, 11, 4, tzinfo=EXCHANGE_TZ)
+    span = args.days * 86400
+    stream = sorted(
+        (start + timedelta(seconds=rng.randrange(span)),
+         rng.choice(TICKERS), args.window)
+        for _ in range(args.requests)
+    )
+
+    cases = [
+        ('end_date (before)', raw_key, '5 min', fixed_ttl),
+        ('session', session_key, '5 min', fixed_ttl),
+        ('session (after)', session_key, 'to close', session_ttl),
+    ]
+    print(f"{'cache key':<20}{'ttl':>10}{'hit rate':>10}")
+    for name, key_fn, ttl_name, ttl_fn in cases:
+        print(f"{name:<20}{ttl_name:>10}"
+              f"{hit_rate(stream, key_fn, ttl_fn):>10.1%}")
+
+    # Same range as app.run_prediction: the window plus a few slack sessions
+    bars = args.window + FETCH_SLACK_SESSIONS
+    fetched = []
+    for now, _, window in stream[:1000]:
+        first, end = fetch_range(last_completed_session(now),
+                                 window + FETCH_SLACK_SESSIONS)
+        days = (datetime.strptime(end, '%Y-%m-%d')
+                - datetime.strptime(first, '%Y-%m-%d')).days
+        fetched.append(days)
+    print(f"\ncalendar days fetched per miss: before {args.window * 3}, "
+          f"after {sum(fetched) / len(fetched):.1f} "
+          f"({bars} bars: window + {FETCH_SLACK_SESSIONS} slack)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""
+Compare serving N tickers with per-ticker models (N models in memory,
+N forward passes) against one global model (one model, one batched pass).
+Each variant is loaded and timed with predict_on_batch, as app.py serves,
+in its own process so memory freed by one can't mask the other.
+Per-ticker RMSE differences are written by `train.py --global` into
+model_artifacts/global_meta.json and printed here when available.
+
+Usage (from backend/):
+    python -m benchmarks.bench_global_model --replicas 5 --repeats 20
+"""
+import argparse
+import glob
+import json
+import multiprocessing as mp
+import os
+import time
+
+import numpy as np
+
+
+def rss_mb() -> float:
+    """Resident set size of this process in MB (Linux)."""
+    with open('/proc/self/statm') as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+
+
+def timed(fn, repeats: int) -> float:
+    """Median wall-clock milliseconds of `fn` over `repeats` runs."""
+    fn()  # warm-up / tracing
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def measure(variant, paths, window, repeats, queue):
+    """
+    Load one variant in a fresh process (so freed memory from the other
+    variant can't hide its footprint) and time its serving call.
+    Puts (models, params, rss MB delta, median ms) on `queue`.
+    """
+    from tensorflow.keras.models import load_model
+
+    from train import build_global_model
+
+    n = len(paths)
+    X = np.random.default_rng(0).random((n, window, 1), dtype=np.float32)
+    base = rss_mb()
+
+    if variant == 'per-ticker':
+        models = [load_model(p, compile=False) for p in paths]
+        mb = rss_mb() - base
+
+        def serve():
+            for i, m in enumerate(models):
+                m.predict_on_batch(X[i:i + 1])
+
+        queue.put((n, sum(m.count_params() for m in models), mb,
+                   timed(serve, repeats)))
+        return
+
+    global_path = os.path.join(os.path.dirname(paths[0]), 'global_best.keras')
+    meta_path = os.path.join(os.path.dirname(paths[0]), 'global_meta.json')
+    if os.path.exists(global_path) and os.path.exists(meta_path):
+        model = load_model(global_path, compile=False)
+        with open(meta_path) as f:
+            n_vocab = len(json.load(f)['tickers'])
+    else:
+        model = build_global_model(window, n)
+        n_vocab = n
+    mb = rss_mb() - base
+    ids = np.arange(n, dtype=np.int32) % n_vocab
+
+    def serve():
+        model.predict_on_batch({'window': X, 'ticker': ids})
+
+    queue.put((1, model.count_params(), mb, timed(serve, repeats)))
+
+
+def run_isolated(variant, paths, window, repeats):
+    ctx = mp.get_context('spawn')
+    queue = ctx.Queue()
+    proc = ctx.Process(target=measure,
+                       args=(variant, paths, window, repeats, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--artifacts', default='model_artifacts')
+    parser.add_argument('--window', type=int, default=60)
+    parser.add_argument('--replicas', type=int, default=1,
+                        help='Load each per-ticker model this many times '
+                             'to simulate a larger universe')
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.artifacts, '*_best.keras')))
+    paths = [p for p in paths if not os.path.basename(p).startswith('global')]
+    paths = paths * args.replicas
+    n = len(paths)
+    if n == 0:
+        raise SystemExit(f"No per-ticker models in {args.artifacts}")
+
+    print(f"tickers served: {n}")
+    print(f"{'':<12}{'models':>8}{'params':>12}{'rss MB':>10}{'latency ms':>12}")
+    for variant in ('per-ticker', 'global'):
+        models, params, mb, ms = run_isolated(
+            variant, paths, args.window, args.repeats)
+        print(f"{variant:<12}{models:>8}{params:>12}{mb:>10.1f}{ms:>12.1f}")
+
+    meta_path = os.path.join(args.artifacts, 'global_meta.json')
+    if os.path.exists(meta_path):
+        with open(meta_path) as f:
+            per_ticker = json.load(f)['per_ticker']
+        print(f"\n{'ticker':<8}{'global':>10}{'per-ticker':>12}{'diff':>10}")
+        for t, r in per_ticker.items():
+            baseline = 'n/a'
+            diff = ''
+            if r['per_ticker_rmse'] is not None:
+                baseline = f"{r['per_ticker_rmse']:.2f}"
+                diff = f"{r['rmse_diff']:+.2f}"
+            print(f"{t:<8}{r['rmse']:>10.2f}{baseline:>12}{diff:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Latency of a point prediction versus point + MC-dropout interval for
+K samples (one tiled batch per step, NumPy quantiles), with the naive
+K separate stochastic calls shown for comparison.
+
+Usage (from backend/):
+    python -m benchmarks.bench_intervals --samples 32 128 --horizon 1
+"""
+import argparse
+import time
+
+import numpy as np
+
+from model import interval_bounds, rollout, sample_paths, stochastic_predict_fn
+from train import build_model
+
+
+def timed(fn, repeats: int) -> float:
+    """Median wall-clock milliseconds of `fn` over `repeats` runs."""
+    fn()  # warm-up / tracing
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--samples', type=int, nargs='+', default=[32, 128])
+    parser.add_argument('--window', type=int, default=60)
+    parser.add_argument('--horizon', type=int, default=1)
+    parser.add_argument('--repeats', type=int, default=30)
+    args = parser.parse_args()
+
+    model = build_model(args.window)
+    sample_fn = stochastic_predict_fn(model)
+    window = np.random.default_rng(0).random(
+        (1, args.window, 1), dtype=np.float32)
+
+    def point():
+        return rollout(model.predict_on_batch, window, args.horizon)
+
+    point_ms = timed(point, args.repeats)
+    print(f"window {args.window}, horizon {args.horizon}")
+    print(f"{'variant':<28} {'ms':>9} {'overhead':>9}")
+    print(f"{'point':<28} {point_ms:>9.2f} {'':>9}")
+    for k in args.samples:
+        def with_interval():
+            point()
+            interval_bounds(sample_paths(sample_fn, window, k, args.horizon))
+
+        def naive():
+            point()
+            paths = [rollout(sample_fn, window, args.horizon) for _ in range(k)]
+            interval_bounds(np.concatenate(paths))
+
+        batched_ms = timed(with_interval, args.repeats)
+        naive_ms = timed(naive, max(1, args.repeats // 10))
+        print(f"{f'point + interval K={k}':<28} {batched_ms:>9.2f} "
+              f"{batched_ms / point_ms:>8.2f}x")
+        print(f"{f'  naive K={k} calls':<28} {naive_ms:>9.2f} "
+              f"{naive_ms / point_ms:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
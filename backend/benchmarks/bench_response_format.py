@@ -0,0 +1,79 @@
+"""
+Measure bytes on the wire and server CPU per /api/predict response
+for each representation: the legacy row layout (before), columnar,
+gzip-compressed variants, and a 304 revalidation (after).
+
+Usage (from backend/):
+    python -m benchmarks.bench_response_format --rows 60 --iterations 2000
+"""
+import argparse
+import json
+import time
+
+from response_format import (
+    serialize_result, compute_etag, representation_etag, etag_matches,
+    gzip_body
+)
+
+
+def build_result(rows: int) -> dict:
+    """Synthetic prediction result with `rows` history points."""
+    history = [
+        {"date": f"2024-{(i // 28) % 12 + 1:02d}-{i % 28 + 1:02d}",
+         "close": round(150.0 + i * 0.37, 6)}
+        for i in range(rows)
+    ]
+    return {"ticker": "AAPL", "history": history, "prediction": 175.123456}
+
+
+def cpu_per_call(fn, iterations: int) -> float:
+    """Mean CPU microseconds per call of `fn`."""
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=60)
+    parser.add_argument('--iterations', type=int, default=2000)
+    args = parser.parse_args()
+
+    result = build_result(args.rows)
+    cached_payload = json.dumps(result, default=str, separators=(',', ':'))
+    base_etag = compute_etag(cached_payload)
+
+    def legacy():
+        # What the endpoint did before: json round-trip + default jsonify
+        return json.dumps(json.loads(cached_payload)).encode()
+
+    def variant(fmt, gz):
+        def run():
+            body = serialize_result(json.loads(cached_payload), fmt)
+            return gzip_body(body) if gz else body
+        return run
+
+    etag = representation_etag(base_etag, 'columnar', 'gzip')
+
+    def revalidate():
+        return etag_matches(etag, etag)
+
+    cases = [
+        ('rows (before)', legacy),
+        ('rows', variant('rows', False)),
+        ('rows + gzip', variant('rows', True)),
+        ('columnar', variant('columnar', False)),
+        ('columnar + gzip', variant('columnar', True)),
+    ]
+
+    print(f"{'representation':<18}{'bytes':>8}{'cpu us/req':>12}")
+    for name, fn in cases:
+        size = len(fn())
+        print(f"{name:<18}{size:>8}{cpu_per_call(fn, args.iterations):>12.1f}")
+    print(f"{'304 not modified':<18}{0:>8}"
+          f"{cpu_per_call(revalidate, args.iterations):>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+Model cache hit rate and model memory per worker with and without
+ticker-affinity sharding. Requests are replayed against W simulated
+workers, each with an LRU model cache of the same capacity as app.py;
+without sharding any worker may get any ticker (round-robin).
+
+Usage (from backend/):
+    python -m benchmarks.bench_sharding --tickers 200 --workers 4 --capacity 32
+"""
+import argparse
+import os
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+from tensorflow.keras.models import load_model
+
+from sharding import HashRing, rss_bytes
+from train import build_model
+
+
+def replay(requests, route, workers: int, capacity: int):
+    """
+    (hit rate, most distinct tickers one worker had to load) for a routing
+    function. The second number is what a worker must hold to never evict.
+    """
+    caches = [OrderedDict() for _ in range(workers)]
+    loaded = [set() for _ in range(workers)]
+    hits = 0
+    for i, ticker in enumerate(requests):
+        w = route(i, ticker)
+        cache = caches[w]
+        if ticker in cache:
+            cache.move_to_end(ticker)
+            hits += 1
+            continue
+        cache[ticker] = True
+        loaded[w].add(ticker)
+        if len(cache) > capacity:
+            cache.popitem(last=False)
+    return hits / len(requests), max(len(seen) for seen in loaded)
+
+
+def model_mb(window: int, count: int) -> float:
+    """Resident memory added per loaded per-ticker model, in MB."""
+    path = os.path.join(tempfile.mkdtemp(), 'bench.keras')
+    build_model(window).save(path)
+    base = rss_bytes()
+    models = [load_model(path, compile=False) for _ in range(count)]
+    per_model = (rss_bytes() - base) / count / 2**20
+    del models
+    return per_model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--tickers', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--capacity', type=int, default=32,
+                        help='Model cache size per worker (MODEL_CACHE_SIZE)')
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--window', type=int, default=60)
+    parser.add_argument('--sample_models', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    tickers = [f"T{i:04d}" for i in range(args.tickers)]
+    # Skewed popularity: a few tickers get most of the traffic
+    weights = 1 / np.arange(1, args.tickers + 1) ** 0.8
+    requests = rng.choice(tickers, size=args.requests, p=weights / weights.sum())
+
+    nodes = [f"worker-{w}" for w in range(args.workers)]
+    ring = HashRing(nodes)
+    index = {n: w for w, n in enumerate(nodes)}
+
+    per_model = model_mb(args.window, args.sample_models)
+    rows = [
+        ('round-robin', replay(requests, lambda i, t: i % args.workers,
+                               args.workers, args.capacity)),
+        ('sharded', replay(requests, lambda i, t: index[ring.node_for(t)],
+                           args.workers, args.capacity)),
+    ]
+
+    print(f"{args.tickers} tickers, {args.workers} workers, "
+          f"cache {args.capacity} models/worker, {per_model:.1f} MB/model")
+    print(f"{'routing':<12} {'hit rate':>9} {'tickers/worker':>15} "
+          f"{'MB to hold all':>15}")
+    for name, (hit_rate, touched) in rows:
+        print(f"{name:<12} {hit_rate:>9.1%} {touched:>15} {touched * per_model:>15.1f}")
+
+
+if __name__ == '__main__':
+    main()
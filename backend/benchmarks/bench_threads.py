@@ -0,0 +1,80 @@
+"""
+p50/p99 single-request latency of W concurrent serving processes with
+TensorFlow's default thread pools versus the cpu_config plan.
+
+Each process builds a serving-sized LSTM and runs `--requests`
+predict_on_batch calls while all the others do the same, like gunicorn
+workers under load.
+
+Usage (from backend/):
+    python -m benchmarks.bench_threads --workers 4 --requests 200 [--pin]
+"""
+import argparse
+import multiprocessing as mp
+import time
+
+import numpy as np
+
+
+def worker(index, workers, governed, pin, window, requests, barrier, results):
+    if governed:
+        # Must run before TensorFlow creates its pools
+        from cpu_config import configure_threads
+        configure_threads('serving', workers=workers, worker_index=index,
+                          pin=pin)
+    from train import build_model
+
+    model = build_model(window)
+    x = np.random.default_rng(index).random((1, window, 1), dtype=np.float32)
+    for _ in range(10):
+        model.predict_on_batch(x)
+
+    barrier.wait()
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        model.predict_on_batch(x)
+        latencies.append((time.perf_counter() - start) * 1000)
+    results.put(latencies)
+
+
+def run(args, governed: bool) -> np.ndarray:
+    ctx = mp.get_context('spawn')
+    barrier = ctx.Barrier(args.workers)
+    results = ctx.Queue()
+    procs = [
+        ctx.Process(target=worker, args=(
+            i, args.workers, governed, args.pin, args.window, args.requests,
+            barrier, results))
+        for i in range(args.workers)
+    ]
+    for p in procs:
+        p.start()
+    latencies = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return np.concatenate(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--window', type=int, default=60)
+    parser.add_argument('--pin', action='store_true',
+                        help='Pin each governed worker to its own cores')
+    args = parser.parse_args()
+
+    from cpu_config import available_cpus, thread_plan
+    plan = thread_plan('serving', args.workers)
+    print(f"{available_cpus()} cpus, {args.workers} workers, "
+          f"governed plan: intra-op {plan['intra_op']}, inter-op {plan['inter_op']}")
+    print(f"{'pools':<10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, governed in (('default', False), ('governed', True)):
+        lat = run(args, governed)
+        print(f"{name:<10} {np.percentile(lat, 50):>8.2f} "
+              f"{np.percentile(lat, 99):>8.2f} {lat.max():>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
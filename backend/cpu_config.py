@@ -0,0 +1,137 @@
+import math
+import os
+import sys
+
+# Per-process CPU thread budget. TensorFlow, OpenMP and BLAS each default
+# to one thread per host core, so N gunicorn workers (or a training run
+# next to them) oversubscribe the CPU. The budget is sized from the cores
+# this container may actually use, divided among the processes of a role.
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+# Plan applied to this process by configure_threads (None until then)
+current_plan = None
+
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+                   'MKL_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS')
+
+
+def _cgroup_quota(root: str):
+    """CPU limit from cgroup v2 cpu.max or v1 cfs quota, or None."""
+    try:
+        with open(os.path.join(root, 'cpu.max')) as f:
+            quota, period = f.read().split()[:2]
+        if quota != 'max':
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open(os.path.join(root, 'cpu', 'cpu.cfs_quota_us')) as f:
+            quota = int(f.read())
+        with open(os.path.join(root, 'cpu', 'cpu.cfs_period_us')) as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def available_cpus(cgroup_root: str = CGROUP_ROOT) -> int:
+    """
+    Cores this process may use: the affinity mask, capped by the
+    container's cgroup CPU quota (rounded up).
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = _cgroup_quota(cgroup_root)
+    if quota:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def thread_plan(role: str, workers: int = 1, cpus: int = None) -> dict:
+    """
+    Thread counts for one process of `role` ('serving' or 'training').
+
+    Serving splits the cores evenly between `workers` processes and runs ops
+    one at a time (single-request graphs gain nothing from inter-op
+    parallelism). Training gets every core with two inter-op threads.
+    """
+    if role not in ('serving', 'training'):
+        raise ValueError(f"Unknown role: {role}")
+    if cpus is None:
+        cpus = available_cpus()
+    if role == 'serving':
+        threads = max(1, cpus // max(1, workers))
+        return {'cpus': cpus, 'intra_op': threads, 'inter_op': 1,
+                'blas': threads}
+    return {'cpus': cpus, 'intra_op': cpus, 'inter_op': min(2, cpus),
+            'blas': cpus}
+
+
+def pin_cpus(worker_index: int, count: int) -> list:
+    """
+    Pin this process to its own slice of `count` allowed cores (wrapping
+    around when there are more workers than cores). Returns the cores.
+    """
+    allowed = sorted(os.sched_getaffinity(0))
+    start = (worker_index * count) % len(allowed)
+    cores = [allowed[(start + i) % len(allowed)] for i in range(count)]
+    os.sched_setaffinity(0, cores)
+    return cores
+
+
+def configure_threads(role: str, workers: int = None, worker_index: int = None,
+                      pin: bool = None) -> dict:
+    """
+    Size TF, OpenMP and BLAS thread pools for this process. Call before the
+    first TensorFlow op runs. Thread counts already set in the environment
+    win. CPU_PIN=1 (or `pin=True`) pins the process to its own cores; that
+    needs `worker_index`.
+
+    `workers` defaults to WEB_CONCURRENCY for serving and 1 for training.
+    Returns the applied plan; later calls return it unchanged.
+    """
+    global current_plan
+    if current_plan is not None:
+        return current_plan
+    if workers is None:
+        workers = int(os.getenv('WEB_CONCURRENCY', '1')) if role == 'serving' else 1
+    if pin is None:
+        pin = os.getenv('CPU_PIN') == '1'
+    plan = thread_plan(role, workers)
+
+    if os.getenv('OMP_NUM_THREADS'):
+        plan['intra_op'] = plan['blas'] = int(os.environ['OMP_NUM_THREADS'])
+    for var in THREAD_ENV_VARS:
+        os.environ.setdefault(var, str(plan['intra_op']))
+    os.environ.setdefault('TF_NUM_INTEROP_THREADS', str(plan['inter_op']))
+
+    # numpy may already have loaded its BLAS; resize that pool directly
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=plan['blas'])
+    except ImportError:
+        pass
+
+    if 'tensorflow' in sys.modules:
+        import tensorflow as tf
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(plan['intra_op'])
+            tf.config.threading.set_inter_op_parallelism_threads(plan['inter_op'])
+        except RuntimeError:
+            # Runtime already initialized; the pools keep their sizes
+            plan['applied'] = False
+
+    if pin and worker_index is not None and hasattr(os, 'sched_setaffinity'):
+        plan['pinned'] = pin_cpus(worker_index, plan['intra_op'])
+
+    print(f"🧵 {role}: {plan['cpus']} cpus / {workers} workers -> "
+          f"intra-op {plan['intra_op']}, inter-op {plan['inter_op']}, "
+          f"blas {plan['blas']}"
+          + (f", pinned to {plan['pinned']}" if 'pinned' in plan else ""))
+    current_plan = plan
+    return plan
@@ -1,6 +1,26 @@
-import yfinance as yf
+import os
+
 import pandas as pd
 
+from fetch_scheduler import FetchError, FetchScheduler, YahooProvider, empty_frame
+
+# Yahoo budget for the whole deployment (calls per second, burst)
+YF_RATE_LIMIT = float(os.getenv('YF_RATE_LIMIT', '2'))
+YF_RATE_BURST = int(os.getenv('YF_RATE_BURST', '4'))
+
+# Every Yahoo download goes through this scheduler (coalescing, batching,
+# retries and the circuit breaker are shared process-wide). The app moves
+# the rate limit to Redis so all workers and shard nodes share it; without
+# Redis each of the node's WEB_CONCURRENCY workers gets an equal share,
+# so N shard nodes can still reach N x YF_RATE_LIMIT.
+_workers = max(1, int(os.getenv('WEB_CONCURRENCY', '1')))
+scheduler = FetchScheduler(
+    YahooProvider(),
+    rate=YF_RATE_LIMIT / _workers,
+    burst=max(1, YF_RATE_BURST // _workers),
+    retries=int(os.getenv('YF_RETRIES', '3')),
+)
+
 
 def fetch_stock_data(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
     """
@@ -8,13 +28,27 @@ def fetch_stock_data(ticker: str, start_date: str, end_date: str) -> pd.DataFram
     Dates should be in 'YYYY-MM-DD' format.
     Returns a DataFrame with columns: ['Open', 'High', 'Low', 'Close', 'Volume'].
     """
-    # Download data
-    df = yf.download(ticker, start=start_date, end=end_date)
+    try:
+        return scheduler.fetch(ticker, start=start_date, end=end_date)
+    except FetchError as e:
+        print(f"❌ {e}")
+        return empty_frame()
 
-    # Keep only the columns we need
-    df = df[['Open', 'High', 'Low', 'Close', 'Volume']]
 
-    return df
+def fetch_stock_data_batch(tickers: list, start_date: str, end_date: str) -> dict:
+    """
+    Fetch daily OHLCV data for many tickers in one Yahoo Finance download.
+    Returns { ticker: DataFrame } with the same columns as fetch_stock_data;
+    tickers without data are omitted.
+    """
+    if not tickers:
+        return {}
+    try:
+        frames = scheduler.fetch_many(tickers, start=start_date, end=end_date)
+    except FetchError as e:
+        print(f"❌ {e}")
+        return {}
+    return {t: df for t, df in frames.items() if not df.empty}
 
 
 if __name__ == "__main__":
@@ -0,0 +1,179 @@
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+# OHLCV-derived model inputs. `close` stays first so the prediction target
+# is always feature 0.
+SHORT_SMA = 10
+LONG_SMA = 50
+VOLATILITY_WINDOW = 20
+VOLUME_WINDOW = 20
+
+FEATURE_NAMES = [
+    'close',
+    'return',
+    'log_volume',
+    f'sma_ratio_{SHORT_SMA}',
+    f'sma_ratio_{LONG_SMA}',
+    f'volatility_{VOLATILITY_WINDOW}',
+    f'volume_ratio_{VOLUME_WINDOW}',
+    'hl_range',
+]
+
+# Bars consumed before the first complete feature row
+WARMUP_BARS = max(LONG_SMA, VOLATILITY_WINDOW + 1, VOLUME_WINDOW) - 1
+
+
+def compute_features(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Vectorized features over a full OHLCV history (training path).
+    Rows before the warm-up period is complete are dropped.
+
+    Returns a DataFrame indexed like `df` with columns FEATURE_NAMES.
+    """
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = df.columns.get_level_values(0)
+
+    close = df['Close'].astype(float)
+    volume = df['Volume'].astype(float)
+    returns = close.pct_change()
+    volume_mean = volume.rolling(VOLUME_WINDOW).mean()
+
+    features = pd.DataFrame({
+        'close': close,
+        'return': returns,
+        'log_volume': np.log1p(volume),
+        f'sma_ratio_{SHORT_SMA}': close / close.rolling(SHORT_SMA).mean() - 1,
+        f'sma_ratio_{LONG_SMA}': close / close.rolling(LONG_SMA).mean() - 1,
+        f'volatility_{VOLATILITY_WINDOW}': returns.rolling(VOLATILITY_WINDOW).std(),
+        f'volume_ratio_{VOLUME_WINDOW}': (
+            volume / volume_mean.where(volume_mean != 0) - 1).fillna(0.0),
+        'hl_range': (df['High'].astype(float) - df['Low'].astype(float)) / close,
+    }, index=df.index)
+    return features.iloc[WARMUP_BARS:]
+
+
+# Running sums are re-summed exactly this often to stop float drift
+RESUM_INTERVAL = 1000
+
+
+class _RollingWindow:
+    """Fixed-length window with O(1) running sum and sum of squares."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.pushes = 0
+
+    def push(self, value: float):
+        if len(self.values) == self.size:
+            old = self.values[0]
+            self.total -= old
+            self.total_sq -= old * old
+        self.values.append(value)
+        self.total += value
+        self.total_sq += value * value
+
+        self.pushes += 1
+        if self.pushes % RESUM_INTERVAL == 0:
+            self.total = float(sum(self.values))
+            self.total_sq = float(sum(v * v for v in self.values))
+
+    def mean(self) -> float:
+        return self.total / len(self.values)
+
+    def std(self) -> float:
+        """Sample standard deviation (ddof=1), as pandas rolling().std()."""
+        n = len(self.values)
+        var = (self.total_sq - self.total * self.total / n) / (n - 1)
+        return float(np.sqrt(max(var, 0.0)))
+
+
+class FeatureState:
+    """
+    Running per-ticker feature state (serving path). Each `update` with a
+    new bar costs O(1) and yields the same feature row `compute_features`
+    would produce for that bar. The last `history_size` rows are kept so a
+    model input window can be read without recomputation.
+    """
+
+    def __init__(self, history_size: int = 60):
+        self.history_size = history_size
+        self.short = _RollingWindow(SHORT_SMA)
+        self.long = _RollingWindow(LONG_SMA)
+        self.returns = _RollingWindow(VOLATILITY_WINDOW)
+        self.volume = _RollingWindow(VOLUME_WINDOW)
+        self.prev_close = None
+        self.bars_seen = 0
+        self.last_date = None
+        self.history = deque(maxlen=history_size)
+        self.dates = deque(maxlen=history_size)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, history_size: int = 60):
+        """Build state by replaying an OHLCV history bar by bar."""
+        state = cls(history_size)
+        state.update_frame(df)
+        return state
+
+    def update_frame(self, df: pd.DataFrame):
+        """Feed every bar of `df` that is newer than the last one seen."""
+        if df.empty:
+            return
+        if isinstance(df.columns, pd.MultiIndex):
+            df = df.copy()
+            df.columns = df.columns.get_level_values(0)
+        if self.last_date is not None:
+            df = df[df.index > self.last_date]
+        for date, o, h, l, c, v in zip(
+                df.index, df['Open'].values, df['High'].values,
+                df['Low'].values, df['Close'].values, df['Volume'].values):
+            self.update(float(o), float(h), float(l), float(c), float(v),
+                        date=date)
+
+    def update(self, open_, high, low, close, volume, date=None):
+        """
+        Consume one bar in O(1). Returns the feature row (np.ndarray ordered
+        as FEATURE_NAMES), or None while still warming up.
+        """
+        if date is not None:
+            self.last_date = date
+        ret = np.nan if self.prev_close is None else close / self.prev_close - 1
+        self.prev_close = close
+        self.short.push(close)
+        self.long.push(close)
+        if not np.isnan(ret):
+            self.returns.push(ret)
+        self.volume.push(volume)
+        self.bars_seen += 1
+
+        if self.bars_seen <= WARMUP_BARS:
+            return None
+
+        volume_mean = self.volume.mean()
+        row = np.array([
+            close,
+            ret,
+            np.log1p(volume),
+            close / self.short.mean() - 1,
+            close / self.long.mean() - 1,
+            self.returns.std(),
+            volume / volume_mean - 1 if volume_mean != 0 else 0.0,
+            (high - low) / close,
+        ])
+        self.history.append(row)
+        self.dates.append(date)
+        return row
+
+    @property
+    def ready(self) -> bool:
+        """True once `history_size` complete feature rows are available."""
+        return len(self.history) == self.history_size
+
+    def window(self) -> np.ndarray:
+        """The last `history_size` feature rows, shape (history_size, n_features)."""
+        return np.array(self.history)
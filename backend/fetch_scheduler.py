@@ -0,0 +1,342 @@
+import ast
+import logging
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+import pandas as pd
+
+OHLCV_COLUMNS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class FetchError(Exception):
+    """An upstream download failed after all retries."""
+
+
+class RateLimitedError(FetchError):
+    """The provider reported throttling."""
+
+
+class CircuitOpenError(FetchError):
+    """Upstream calls are suspended after repeated failures."""
+
+
+def empty_frame() -> pd.DataFrame:
+    return pd.DataFrame(columns=OHLCV_COLUMNS)
+
+
+# Per-ticker errors that mean "no data" rather than an upstream failure
+MISSING_DATA_MARKERS = ('delisted', 'no data found', 'no price data')
+RATE_LIMIT_MARKERS = ('rate limit', 'too many requests')
+
+
+class _DownloadErrors(logging.Handler):
+    """
+    Per-ticker errors that yf.download logs from the calling thread as
+    "['T1', 'T2']: <error>" (the same format in yfinance 0.2.x and 1.x).
+    """
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.thread = threading.get_ident()
+        self.errors = {}
+
+    def emit(self, record):
+        if record.thread != self.thread:
+            return
+        symbols, sep, error = record.getMessage().strip().partition(']: ')
+        if not sep or not symbols.startswith('['):
+            return
+        try:
+            tickers = ast.literal_eval(symbols + ']')
+        except (ValueError, SyntaxError):
+            return
+        for ticker in tickers:
+            self.errors[ticker] = error
+
+
+class YahooProvider:
+    """
+    Daily OHLCV downloads from Yahoo Finance, many tickers per call.
+    """
+
+    def download(self, tickers, start=None, end=None, period=None) -> dict:
+        """
+        Returns { ticker: DataFrame[OHLCV] }; tickers without data are omitted.
+        Raises RateLimitedError when Yahoo throttles the request and
+        FetchError when every ticker failed upstream (network errors,
+        blocked requests, outages), so the scheduler retries and the
+        circuit breaker sees the failure.
+        """
+        import yfinance as yf
+
+        # yf.download swallows per-ticker errors and only logs them
+        capture = _DownloadErrors()
+        yf_logger = logging.getLogger('yfinance')
+        yf_logger.addHandler(capture)
+        try:
+            df = yf.download(
+                tickers, start=start, end=end, period=period, interval='1d',
+                auto_adjust=True, group_by='ticker', progress=False,
+                threads=True
+            )
+        finally:
+            yf_logger.removeHandler(capture)
+        errors = capture.errors
+
+        messages = list(errors.values())
+        if any(marker in msg.lower() for msg in messages
+               for marker in RATE_LIMIT_MARKERS):
+            raise RateLimitedError(f"Yahoo rate limit for {tickers}")
+        failures = [msg for msg in messages
+                    if not any(m in msg.lower() for m in MISSING_DATA_MARKERS)]
+        if failures and all(t in errors for t in tickers):
+            raise FetchError(f"Yahoo download failed for {tickers}: {failures[0]}")
+
+        frames = {}
+        for ticker in tickers:
+            if isinstance(df.columns, pd.MultiIndex):
+                if ticker not in df.columns.get_level_values(0):
+                    continue
+                ticker_df = df[ticker]
+            else:
+                ticker_df = df
+            if not set(OHLCV_COLUMNS) <= set(ticker_df.columns):
+                continue
+            ticker_df = ticker_df[OHLCV_COLUMNS].dropna(subset=['Close'])
+            if not ticker_df.empty:
+                frames[ticker] = ticker_df
+        return frames
+
+
+class RedisTokenBucket:
+    """
+    Token bucket kept in Redis, so every worker process and shard node
+    draws from one Yahoo budget. Refill uses the Redis server clock.
+    """
+
+    SCRIPT = """
+    local now = redis.call('TIME')
+    now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+    local rate, burst = tonumber(ARGV[1]), tonumber(ARGV[2])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+    local tokens = tonumber(state[1]) or burst
+    local at = tonumber(state[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - at) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 60)
+    return tostring(wait)
+    """
+
+    def __init__(self, redis_client, rate, burst, key='fetch:tokens'):
+        self.rate = rate
+        self.burst = burst
+        self.key = key
+        self._script = redis_client.register_script(self.SCRIPT)
+
+    def take(self) -> float:
+        """Take a token: 0 on success, else the seconds until one refills."""
+        return float(self._script(keys=[self.key],
+                                  args=[self.rate, self.burst]))
+
+
+class _Batch:
+    """Tickers waiting to be downloaded together for one date range."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.tickers = []
+        self.futures = []
+
+
+class FetchScheduler:
+    """
+    Single gateway for upstream price downloads.
+
+    - Coalescing: concurrent requests for the same ticker and range share
+      one in-flight download.
+    - Batching: requests for the same range that arrive within
+      `batch_window` seconds are merged into one provider call (up to
+      `max_batch` tickers).
+    - Rate limiting: a token bucket allows `rate` provider calls per second
+      with bursts of `burst`, shared by every caller. The bucket is local to
+      the process unless share_rate_limit() moves it to Redis.
+    - Retries with exponential backoff and jitter.
+    - Circuit breaker: after `breaker_threshold` consecutive failures calls
+      fail fast with CircuitOpenError for `breaker_cooldown` seconds, then
+      one trial call is let through.
+
+    There is no background thread: the first caller of a batch waits for
+    the batch window and performs the download for everyone in it.
+    """
+
+    def __init__(self, provider, rate=2.0, burst=4, batch_window=0.05,
+                 max_batch=50, retries=3, backoff=0.5, max_backoff=8.0,
+                 breaker_threshold=5, breaker_cooldown=30.0):
+        self.provider = provider
+        self.rate = rate
+        self.burst = burst
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._pending = {}
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._failures = 0
+        self._opened_at = None
+        self.shared_bucket = None
+        self.stats = {'requests': 0, 'coalesced': 0, 'provider_calls': 0,
+                      'retries': 0, 'rejected': 0}
+
+    def fetch(self, ticker, start=None, end=None, period=None) -> pd.DataFrame:
+        """OHLCV frame for one ticker (empty when the provider has no data)."""
+        return self.fetch_many([ticker], start, end, period)[ticker]
+
+    def fetch_many(self, tickers, start=None, end=None, period=None) -> dict:
+        """
+        { ticker: DataFrame } for every requested ticker, with empty frames
+        for tickers without data. Raises FetchError when the download fails.
+        """
+        spec = (start, end, period)
+        futures, leading = {}, []
+        with self._lock:
+            for ticker in dict.fromkeys(tickers):
+                self.stats['requests'] += 1
+                key = (ticker, spec)
+                if key in self._inflight:
+                    self.stats['coalesced'] += 1
+                    futures[ticker] = self._inflight[key]
+                    continue
+                future = Future()
+                self._inflight[key] = future
+                futures[ticker] = future
+
+                batch = self._pending.get(spec)
+                if batch is None or len(batch.tickers) >= self.max_batch:
+                    batch = _Batch(spec)
+                    self._pending[spec] = batch
+                    leading.append(batch)
+                batch.tickers.append(ticker)
+                batch.futures.append(future)
+
+        for batch in leading:
+            self._run_batch(batch)
+        return {t: f.result() for t, f in futures.items()}
+
+    def _run_batch(self, batch):
+        # Give concurrent callers a moment to join this batch
+        if self.batch_window > 0:
+            time.sleep(self.batch_window)
+        with self._lock:
+            if self._pending.get(batch.spec) is batch:
+                del self._pending[batch.spec]
+            tickers, futures = list(batch.tickers), list(batch.futures)
+
+        try:
+            frames = self._download(tickers, *batch.spec)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+        else:
+            for ticker, future in zip(tickers, futures):
+                future.set_result(frames.get(ticker, empty_frame()))
+        finally:
+            with self._lock:
+                for ticker in tickers:
+                    self._inflight.pop((ticker, batch.spec), None)
+
+    def _download(self, tickers, start, end, period):
+        for attempt in range(self.retries + 1):
+            self._check_breaker()
+            self._acquire_token()
+            try:
+                with self._lock:
+                    self.stats['provider_calls'] += 1
+                frames = self.provider.download(
+                    tickers, start=start, end=end, period=period)
+            except Exception as e:
+                self._record_failure()
+                if attempt == self.retries:
+                    raise FetchError(
+                        f"Download failed for {tickers}: {e}") from e
+                with self._lock:
+                    self.stats['retries'] += 1
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                time.sleep(delay * random.uniform(0.5, 1.0))
+            else:
+                self._record_success()
+                return frames
+
+    def share_rate_limit(self, redis_client, rate=None, burst=None):
+        """
+        Draw tokens from a Redis bucket shared with every other process
+        (`rate`/`burst` default to this scheduler's). While Redis errors,
+        calls fall back to the local bucket.
+        """
+        self.shared_bucket = RedisTokenBucket(
+            redis_client, rate or self.rate, burst or self.burst)
+
+    def _acquire_token(self):
+        while True:
+            wait = self._take_token()
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def _take_token(self) -> float:
+        if self.shared_bucket is not None:
+            try:
+                return self.shared_bucket.take()
+            except Exception as e:
+                print(f"Redis rate limiter error: {e}")
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens
+                               + (now - self._refilled_at) * self.rate)
+            self._refilled_at = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def _check_breaker(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.breaker_cooldown:
+                self.stats['rejected'] += 1
+                raise CircuitOpenError("Upstream circuit open")
+            # Half-open: let this call through as the trial
+            self._opened_at = None
+            self._failures = self.breaker_threshold - 1
+
+    def _record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.breaker_threshold:
+                self._opened_at = time.monotonic()
+
+    def _record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    @property
+    def circuit_open(self) -> bool:
+        with self._lock:
+            return (self._opened_at is not None and
+                    time.monotonic() - self._opened_at < self.breaker_cooldown)
@@ -0,0 +1,12 @@
+import os
+
+bind = '0.0.0.0:5001'
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+
+
+def post_fork(server, worker):
+    # Runs in the worker before app.py is imported: split the CPU budget
+    # between workers (and pin each to its own cores when CPU_PIN=1)
+    from cpu_config import configure_threads
+    configure_threads('serving', workers=server.cfg.workers,
+                      worker_index=(worker.age - 1) % server.cfg.workers)
@@ -2,6 +2,30 @@ import numpy as np
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
 
+from features import compute_features
+
+# Central band reported for MC-dropout prediction intervals
+INTERVAL_LEVEL = 0.9
+
+
+def make_windows(scaled: np.ndarray, window_size: int):
+    """
+    Build sliding windows over a scaled (n, n_features) series.
+    The target is the next value of the first column (close).
+
+    Returns:
+        X of shape (n - window_size, window_size, n_features),
+        y of shape (n - window_size,)
+    """
+    X, y = [], []
+    for i in range(window_size, len(scaled)):
+        X.append(scaled[i-window_size:i])
+        y.append(scaled[i, 0])
+
+    X = np.array(X).reshape(-1, window_size, scaled.shape[1])
+    y = np.array(y)
+    return X, y
+
 
 def preprocess_data(
     df: pd.DataFrame,
@@ -32,13 +56,7 @@ def preprocess_data(
     scaled = scaler.fit_transform(close_prices)
 
     # Build sliding windows
-    X, y = [], []
-    for i in range(window_size, len(scaled)):
-        X.append(scaled[i-window_size:i, 0])
-        y.append(scaled[i, 0])
-
-    X = np.array(X).reshape(-1, window_size, 1)
-    y = np.array(y)
+    X, y = make_windows(scaled, window_size)
 
     # Split into train and test sets
     split_idx = int(len(X) * split_ratio)
@@ -48,6 +66,127 @@ def preprocess_data(
     return X_train, y_train, X_test, y_test, scaler
 
 
+def preprocess_features(
+    df: pd.DataFrame,
+    window_size: int = 60,
+    split_ratio: float = 0.8
+):
+    """
+    Like `preprocess_data`, but windows hold every OHLCV-derived feature
+    from `features.compute_features` (close first) instead of close only.
+    The scaler is fit per feature; the target is the scaled close.
+
+    Returns:
+        X_train, y_train, X_test, y_test, scaler
+    """
+    features = compute_features(df).values
+    scaler = MinMaxScaler()
+    scaled = scaler.fit_transform(features)
+
+    X, y = make_windows(scaled, window_size)
+
+    split_idx = int(len(X) * split_ratio)
+    X_train, X_test = X[:split_idx], X[split_idx:]
+    y_train, y_test = y[:split_idx], y[split_idx:]
+
+    return X_train, y_train, X_test, y_test, scaler
+
+
+def rollout(predict_fn, windows: np.ndarray, horizon: int) -> np.ndarray:
+    """
+    Autoregressive multi-step forecast for a batch of windows.
+    Each step runs `predict_fn` once on the whole batch (shape (n, window, 1),
+    returning n scaled predictions) and slides the prediction into the
+    window, so n series x `horizon` steps cost `horizon` batched calls.
+
+    Multi-feature windows (n, window, f > 1) support a single step only,
+    since the other features of a predicted bar are unknown.
+
+    Returns:
+        Scaled predictions of shape (n, horizon)
+    """
+    X = np.array(windows, dtype=np.float32)
+    if horizon > 1 and X.shape[2] != 1:
+        raise ValueError(
+            f"rollout needs single-feature windows for horizon > 1, "
+            f"got {X.shape[2]} features")
+    steps = np.empty((len(X), horizon), dtype=np.float32)
+    for h in range(horizon):
+        steps[:, h] = np.asarray(predict_fn(X)).reshape(-1)
+        if h + 1 < horizon:
+            X = np.concatenate([X[:, 1:, :], steps[:, h, None, None]], axis=1)
+    return steps
+
+
+def has_dropout(model) -> bool:
+    """True when `model` has dropout layers to sample (MC-dropout)."""
+    return any(layer.__class__.__name__ == 'Dropout' and layer.rate > 0
+               for layer in model.layers)
+
+
+def stochastic_predict_fn(model):
+    """
+    Batched forward pass with dropout kept active, compiled once per model.
+    Each row of the batch gets an independent dropout mask.
+    """
+    import tensorflow as tf
+    return tf.function(lambda X: model(X, training=True),
+                       reduce_retracing=True)
+
+
+def sample_paths(sample_fn, window: np.ndarray, samples: int,
+                 horizon: int = 1) -> np.ndarray:
+    """
+    `samples` stochastic forecasts of one (1, window, 1) input: the window
+    is tiled into a single batch, so each step is one forward pass.
+
+    Returns:
+        Scaled sample paths of shape (samples, horizon)
+    """
+    return rollout(sample_fn, np.repeat(window, samples, axis=0), horizon)
+
+
+def interval_bounds(paths: np.ndarray, level: float = INTERVAL_LEVEL):
+    """
+    (lower, upper) quantiles of the central `level` band per step, over
+    sample paths of shape (samples, horizon).
+    """
+    lower, upper = np.quantile(paths, [(1 - level) / 2, (1 + level) / 2],
+                               axis=0)
+    return lower, upper
+
+
+def stream_global_batches(series: list, window_size: int, batch_size: int,
+                          seed: int = 0):
+    """
+    Endless batches of windows sampled across many tickers, for training a
+    single global model without materializing every window in memory.
+
+    `series` holds one scaled 1-D array per ticker (index = ticker id).
+    Tickers are sampled in proportion to how many windows they have.
+
+    Yields:
+        ({"window": X, "ticker": ids}, y) with X of shape (batch, window_size, 1)
+    """
+    rng = np.random.default_rng(seed)
+    counts = np.array([max(len(s) - window_size, 0) for s in series])
+    if counts.sum() == 0:
+        raise ValueError("No ticker has more than window_size points")
+    weights = counts / counts.sum()
+    offsets = np.arange(window_size)
+
+    while True:
+        ids = rng.choice(len(series), size=batch_size, p=weights)
+        X = np.empty((batch_size, window_size), dtype=np.float32)
+        y = np.empty(batch_size, dtype=np.float32)
+        for t in np.unique(ids):
+            rows = np.flatnonzero(ids == t)
+            starts = rng.integers(0, counts[t], size=len(rows))
+            X[rows] = series[t][starts[:, None] + offsets]
+            y[rows] = series[t][starts + window_size]
+        yield ({"window": X[..., None], "ticker": ids.astype(np.int32)}, y)
+
+
 if __name__ == "__main__":
     from data_loader import fetch_stock_data
 
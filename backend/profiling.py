@@ -0,0 +1,147 @@
+import cProfile
+import io
+import itertools
+import json
+import pstats
+import shutil
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+
+# Per-request profiles kept for the admin endpoints (Redis or memory). Only
+# requests that opt in are profiled; everything else pays one header check.
+
+PROFILE_TOP_N = 40  # functions kept in each stored report
+
+
+class ProfileStore:
+    """
+    Bounded ring buffer of captured profiles; the oldest entry (and its
+    TF trace directory, if any) is dropped when full.
+
+    With `redis_client` the buffer is a Redis list (LPUSH + LTRIM) shared by
+    every worker, so a profile id can be looked up from any of them.
+    Without Redis (or when it errors) entries stay in this process.
+    """
+
+    def __init__(self, size: int = 50, redis_client=None,
+                 key: str = 'profiles'):
+        self.size = size
+        self.redis = redis_client
+        self.key = key
+        self._entries = deque()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def add(self, entry: dict) -> int:
+        if self.redis:
+            try:
+                entry['id'] = int(self.redis.incr(f"{self.key}:seq"))
+                pipe = self.redis.pipeline()
+                pipe.lpush(self.key, json.dumps(entry, default=str))
+                pipe.lrange(self.key, self.size, -1)
+                pipe.ltrim(self.key, 0, self.size - 1)
+                evicted = pipe.execute()[1]
+                for raw in evicted:
+                    _remove_trace(json.loads(raw))
+                return entry['id']
+            except Exception as e:
+                print(f"Redis profile store error: {e}")
+        with self._lock:
+            entry['id'] = next(self._ids)
+            self._entries.append(entry)
+            while len(self._entries) > self.size:
+                _remove_trace(self._entries.popleft())
+        return entry['id']
+
+    def _newest_first(self) -> list:
+        if self.redis:
+            try:
+                return [json.loads(raw)
+                        for raw in self.redis.lrange(self.key, 0, -1)]
+            except Exception as e:
+                print(f"Redis profile store error: {e}")
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def get(self, profile_id: int):
+        for entry in self._newest_first():
+            if entry['id'] == profile_id:
+                return entry
+        return None
+
+    def summaries(self) -> list:
+        """Newest first, without the report text."""
+        return [{k: v for k, v in e.items() if k != 'stats'}
+                for e in self._newest_first()]
+
+
+def _remove_trace(entry: dict):
+    if entry.get('tf_trace'):
+        shutil.rmtree(entry['tf_trace'], ignore_errors=True)
+
+
+def format_stats(profile: cProfile.Profile, sort: str = 'cumulative',
+                 limit: int = PROFILE_TOP_N) -> str:
+    out = io.StringIO()
+    pstats.Stats(profile, stream=out).sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+# TensorFlow allows one profiler session per process
+_tf_trace_lock = threading.Lock()
+
+
+class RequestProfiler:
+    """
+    Context manager capturing a cProfile trace of the current thread and,
+    with `tf_logdir`, a TensorFlow op trace (viewable in TensorBoard).
+    """
+
+    def __init__(self, tf_logdir: str = None):
+        self.tf_logdir = tf_logdir
+        self.tf_active = False
+        self.profile = None
+        self.duration = None
+
+    def __enter__(self):
+        if self.tf_logdir and _tf_trace_lock.acquire(blocking=False):
+            try:
+                import tensorflow as tf
+                tf.profiler.experimental.start(self.tf_logdir)
+                self.tf_active = True
+            except Exception as e:
+                print(f"❌ TF trace not started: {e}")
+                _tf_trace_lock.release()
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self.profile = cProfile.Profile()
+        try:
+            self.profile.enable()
+        except ValueError:
+            # Another profiler is already active in this thread
+            self.profile = None
+        return self
+
+    def __exit__(self, *exc):
+        if self.profile:
+            self.profile.disable()
+        self.duration = time.perf_counter() - self._start
+        if self.tf_active:
+            try:
+                import tensorflow as tf
+                tf.profiler.experimental.stop()
+            finally:
+                _tf_trace_lock.release()
+        return False
+
+    def entry(self, **fields) -> dict:
+        """Profile record for ProfileStore.add."""
+        return {
+            **fields,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(self.duration * 1000, 3),
+            "tf_trace": self.tf_logdir if self.tf_active else None,
+            "stats": format_stats(self.profile) if self.profile else None,
+        }
@@ -0,0 +1,116 @@
+import gzip
+import hashlib
+import json
+
+# Media type a client can send in `Accept` to ask for the columnar layout
+COLUMNAR_MIME = 'application/vnd.stockpredictor.columnar+json'
+RESPONSE_FORMATS = ('rows', 'columnar')
+
+# Level 6 is the usual size/CPU sweet spot for small JSON bodies
+GZIP_LEVEL = 6
+
+
+def negotiate_format(data: dict, accept_header: str) -> str:
+    """
+    Pick the response layout for a prediction request.
+    An explicit `"format"` in the JSON body wins over the `Accept` header.
+    Returns 'rows' (the default) or 'columnar'.
+    """
+    requested = (data.get('format') or '').lower()
+    if requested in RESPONSE_FORMATS:
+        return requested
+    if accept_header and COLUMNAR_MIME in accept_header:
+        return 'columnar'
+    return 'rows'
+
+
+def to_columnar(result: dict) -> dict:
+    """
+    Convert `history` from a list of {date, close} rows into parallel
+    `dates` / `closes` arrays. Every other key is passed through untouched.
+    """
+    columnar = {k: v for k, v in result.items() if k != 'history'}
+    history = result.get('history') or []
+    columnar['dates'] = [row['date'] for row in history]
+    columnar['closes'] = [row['close'] for row in history]
+    return columnar
+
+
+def serialize_result(result: dict, fmt: str = 'rows') -> bytes:
+    """
+    Serialize a prediction result to compact JSON bytes in the given layout.
+    """
+    if fmt == 'columnar':
+        result = to_columnar(result)
+    return json.dumps(result, default=str, separators=(',', ':')).encode()
+
+
+def compute_etag(payload) -> str:
+    """
+    Strong validator for a cached payload (str or bytes): a truncated SHA-256
+    of its canonical JSON. The quotes are not included.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode()
+    return hashlib.sha256(payload).hexdigest()[:32]
+
+
+def representation_etag(base_etag: str, fmt: str, encoding: str = None) -> str:
+    """
+    Quoted ETag for one concrete representation of a result. Layout and
+    content-coding are part of the tag so every byte-distinct body gets its
+    own strong validator.
+    """
+    suffix = f"-{fmt}"
+    if encoding:
+        suffix += f"-{encoding}"
+    return f'"{base_etag}{suffix}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Evaluate an `If-None-Match` header against `etag` (quoted form).
+    Uses the weak comparison RFC 9110 prescribes for If-None-Match.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    target = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    True when the client lists gzip in `Accept-Encoding` without q=0.
+    An explicit gzip entry wins over `*`; malformed q-values count as q=1.
+    """
+    if not accept_encoding:
+        return False
+    ranges = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.strip().partition(';')
+        q = 1.0
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                pass
+        ranges.setdefault(token.strip().lower(), q)
+    q = ranges.get('gzip', ranges.get('*'))
+    return q is not None and q > 0
+
+
+def gzip_body(body: bytes) -> bytes:
+    """
+    Gzip a response body. mtime is pinned so identical input always
+    produces identical bytes (required for a strong ETag).
+    """
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
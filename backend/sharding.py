@@ -0,0 +1,79 @@
+import bisect
+import hashlib
+import os
+
+# Ticker-affinity sharding: each ticker is owned by one serving node, chosen
+# by consistent hashing so a membership change only moves the tickers of
+# the node that joined or left.
+
+VNODES = 128  # points per node on the ring; more points = smoother balance
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], 'big')
+
+
+class HashRing:
+    """
+    Consistent-hash ring mapping keys (tickers) to nodes (base URLs).
+    """
+
+    def __init__(self, nodes=(), vnodes: int = VNODES):
+        self.vnodes = vnodes
+        self._points = []
+        self._owners = {}
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> list:
+        return sorted(set(self._owners.values()))
+
+    def add(self, node: str):
+        for i in range(self.vnodes):
+            point = _hash(f"{node}#{i}")
+            if point not in self._owners:
+                bisect.insort(self._points, point)
+                self._owners[point] = node
+
+    def remove(self, node: str):
+        self._points = [p for p in self._points if self._owners[p] != node]
+        self._owners = {p: self._owners[p] for p in self._points}
+
+    def node_for(self, key: str):
+        """Owning node for `key`, or None when the ring is empty."""
+        if not self._points:
+            return None
+        i = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[self._points[i]]
+
+
+def moved_keys(old: HashRing, new: HashRing, keys) -> dict:
+    """
+    { key: (old_node, new_node) } for every key whose owner changes.
+    """
+    moves = {}
+    for key in keys:
+        before, after = old.node_for(key), new.node_for(key)
+        if before != after:
+            moves[key] = (before, after)
+    return moves
+
+
+def load_members(path: str) -> list:
+    """
+    Node base URLs from a membership file (one per line, '#' comments).
+    """
+    with open(path) as f:
+        lines = (line.split('#', 1)[0].strip() for line in f)
+        return [line for line in lines if line]
+
+
+def rss_bytes() -> int:
+    """Resident memory of this process."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
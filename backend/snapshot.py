@@ -0,0 +1,49 @@
+import base64
+import json
+
+from response_format import compute_etag
+
+# Hex digits of each item hash kept in a version token
+VERSION_DIGEST_LEN = 12
+
+
+def item_version(item: dict) -> str:
+    """
+    Short content hash of one snapshot item (a quote row or an error body).
+    """
+    payload = json.dumps(item, sort_keys=True, default=str,
+                         separators=(',', ':'))
+    return compute_etag(payload)[:VERSION_DIGEST_LEN]
+
+
+def encode_version(versions: dict) -> str:
+    """
+    Pack { item_key: hash } into an opaque, URL-safe version token.
+    The token is self-contained so the server keeps no per-client state.
+    """
+    payload = json.dumps(versions, sort_keys=True, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_version(token: str) -> dict:
+    """
+    Inverse of `encode_version`. Missing or malformed tokens decode to {}
+    so the caller falls back to a full snapshot.
+    """
+    if not token:
+        return {}
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        versions = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        return {}
+    if not isinstance(versions, dict):
+        return {}
+    return {str(k): str(v) for k, v in versions.items()}
+
+
+def changed_items(versions: dict, since: dict) -> set:
+    """
+    Keys whose hash differs from (or is absent in) the `since` version.
+    """
+    return {k for k, v in versions.items() if since.get(k) != v}
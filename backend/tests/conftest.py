@@ -0,0 +1,60 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Shared stand-ins for Yahoo Finance. Tests get them through the fixtures
+# below; worker subprocesses (test_sharding) import fake_prices directly.
+
+
+def fake_prices(ticker, start_date, end_date):
+    """Deterministic business-day prices standing in for Yahoo."""
+    dates = pd.bdate_range('2020-01-01', '2024-12-31')
+    rng = np.random.default_rng(0)
+    close = 100 + np.cumsum(rng.normal(0, 0.5, len(dates)))
+    df = pd.DataFrame({
+        'Open': close, 'High': close + 1, 'Low': close - 1,
+        'Close': close, 'Volume': 1_000_000
+    }, index=dates)
+    return df[(df.index >= start_date) & (df.index < end_date)]
+
+
+class FakeProvider:
+    """Local stand-in for Yahoo with injected latency and failures."""
+
+    def __init__(self, latency=0.0, failures=0):
+        self.latency = latency
+        self.failures = failures
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def download(self, tickers, start=None, end=None, period=None):
+        with self.lock:
+            self.calls.append(list(tickers))
+            fail = self.failures > 0
+            if fail:
+                self.failures -= 1
+        time.sleep(self.latency)
+        if fail:
+            raise ConnectionError("429 Too Many Requests")
+        index = pd.date_range('2024-01-02', periods=3, freq='B')
+        return {
+            t: pd.DataFrame({c: np.arange(3.0) + 1 for c in
+                             ['Open', 'High', 'Low', 'Close', 'Volume']},
+                            index=index)
+            for t in tickers if t != 'MISSING'
+        }
+
+
+@pytest.fixture
+def fake_fetch():
+    """fetch_stock_data replacement serving fake_prices."""
+    return fake_prices
+
+
+@pytest.fixture
+def fake_provider():
+    """FakeProvider factory: fake_provider(latency=..., failures=...)."""
+    return FakeProvider
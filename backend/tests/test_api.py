@@ -1,4 +1,5 @@
 import json
+import numpy as np
 import pytest
 from app import app
 
@@ -97,3 +98,414 @@ def test_quotes_endpoint(client):
     data = rv.get_json()
     assert isinstance(data, list)
     assert len(data) > 0
+
+
+def test_snapshot_endpoint(client):
+    payload = {"tickers": ["AAPL", "MSFT"], "predict": ["AAPL", "INVALID"]}
+    rv = client.post(
+        "/api/snapshot",
+        data=json.dumps(payload),
+        content_type="application/json"
+    )
+    assert rv.status_code == 200
+    js = rv.get_json()
+    assert js["delta"] is False
+    assert isinstance(js["version"], str)
+    assert isinstance(js["quotes"], list)
+    assert set(js["predictions"]) == {"AAPL", "INVALID"}
+    assert "error" in js["predictions"]["INVALID"]
+
+    # Unchanged state: a delta request returns no items
+    payload["since"] = js["version"]
+    rv = client.post(
+        "/api/snapshot",
+        data=json.dumps(payload),
+        content_type="application/json"
+    )
+    delta = rv.get_json()
+    assert delta["delta"] is True
+    assert delta["version"] == js["version"]
+    assert delta["quotes"] == []
+    assert delta["predictions"] == {}
+
+
+def test_predict_universe_endpoint(client):
+    rv = client.post(
+        "/api/predict/universe",
+        data=json.dumps({"tickers": ["AAPL", "MSFT"]}),
+        content_type="application/json"
+    )
+    # 404 until a global model has been trained with `train.py --global`
+    if rv.status_code == 404:
+        assert "error" in rv.get_json()
+        return
+
+    assert rv.status_code == 200
+    js = rv.get_json()
+    assert set(js["predictions"]) | set(js["missing"]) == {"AAPL", "MSFT"}
+
+
+def test_predict_universe_single_pass(client, tmp_path, monkeypatch, fake_fetch):
+    import app as app_module
+    import train
+
+    monkeypatch.setattr(train, 'fetch_stock_data', fake_fetch)
+    train.train_global_model(
+        ['AAA', 'BBB'], '2020-01-01', '2024-06-01', 10, 1, 64, str(tmp_path))
+    paths = train.global_artifact_paths(str(tmp_path))
+    monkeypatch.setattr(app_module, 'GLOBAL_MODEL_PATH', paths['model'])
+    monkeypatch.setattr(app_module, 'GLOBAL_SCALERS_PATH', paths['scalers'])
+    monkeypatch.setattr(app_module, 'GLOBAL_META_PATH', paths['meta'])
+    monkeypatch.setattr(app_module, 'global_artifacts', {})
+    monkeypatch.setattr(
+        app_module, 'fetch_stock_data_batch',
+        lambda tickers, start, end: {t: fake_fetch(t, start, end) for t in tickers})
+
+    rv = client.post(
+        "/api/predict/universe",
+        data=json.dumps({"tickers": ["AAA", "BBB", "ZZZ"],
+                         "end_date": "2024-07-01"}),
+        content_type="application/json"
+    )
+    assert rv.status_code == 200
+    js = rv.get_json()
+    assert js["window"] == 10
+    assert set(js["predictions"]) == {"AAA", "BBB"}
+    assert js["missing"] == ["ZZZ"]
+    assert all(isinstance(p["prediction"], float)
+               for p in js["predictions"].values())
+
+    rv = client.post(
+        "/api/predict/universe",
+        data=json.dumps({"tickers": ["AAA", "BBB"], "horizon": 5,
+                         "end_date": "2024-07-01"}),
+        content_type="application/json"
+    )
+    js = rv.get_json()
+    assert js["horizon"] == 5
+    assert js["forecast_dates"][0] == "2024-07-01"
+    for p in js["predictions"].values():
+        assert len(p["forecast"]) == 5
+        assert p["forecast"][0] == p["prediction"]
+
+
+def test_predict_invalid_horizon(client):
+    rv = client.post(
+        "/api/predict",
+        data=json.dumps({"ticker": "AAPL", "horizon": 0}),
+        content_type="application/json"
+    )
+    assert rv.status_code == 400
+
+
+@pytest.mark.parametrize("horizon", ["abc", None, "2.5"])
+def test_malformed_horizon_is_a_bad_request(client, horizon):
+    for path, body in (("/api/predict", {"ticker": "AAPL"}),
+                       ("/api/snapshot", {"predict": ["AAPL"]})):
+        rv = client.post(path, json={**body, "horizon": horizon})
+        assert rv.status_code == 400
+
+
+def test_feature_model_streams_new_bars_only(client, tmp_path, monkeypatch, fake_fetch):
+    import app as app_module
+    import train
+    from features import compute_features
+    from tensorflow.keras.models import load_model
+
+    artifacts = tmp_path / "model_artifacts"
+    artifacts.mkdir()
+    monkeypatch.setattr(train, 'fetch_stock_data', fake_fetch)
+    train.train_single_model('FEAT', '2020-01-01', '2024-06-01', 10, 1, 64,
+                             str(artifacts), use_features=True)
+
+    calls = []
+
+    def recording_fetch(ticker, start, end):
+        calls.append((start, end))
+        return fake_fetch(ticker, start, end)
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(app_module, 'fetch_stock_data', recording_fetch)
+    monkeypatch.setattr(app_module, 'feature_states', {})
+
+    def post(end_date):
+        return client.post(
+            "/api/predict",
+            data=json.dumps({"ticker": "FEAT", "window": 10,
+                             "end_date": end_date}),
+            content_type="application/json"
+        )
+
+    first = post("2024-07-01")
+    second = post("2024-07-09")
+    assert first.status_code == 200 and second.status_code == 200
+
+    # Cold start warms up from history; the next request only fetches new bars
+    assert len(calls) == 2
+    assert calls[1] == ("2024-06-29", "2024-07-09")
+
+    # Serving features match the vectorized training features
+    df = fake_fetch('FEAT', '2024-01-01', '2024-07-09')
+    window = compute_features(df).values[-10:]
+    scaler = app_module.joblib.load(str(artifacts / "FEAT_scaler.pkl"))
+    model = load_model(str(artifacts / "FEAT_best.h5"), compile=False)
+    expected = model.predict(scaler.transform(window)[None], verbose=0)[0, 0]
+    expected = scaler.data_min_[0] + expected * scaler.data_range_[0]
+
+    js = second.get_json()
+    assert js["history"][-1]["date"] == "2024-07-08"
+    assert np.isclose(js["prediction"], expected, rtol=1e-5)
+
+
+def test_feature_model_refuses_stale_state(client, tmp_path, monkeypatch, fake_fetch):
+    import app as app_module
+    import train
+    from fetch_scheduler import empty_frame
+
+    artifacts = tmp_path / "model_artifacts"
+    artifacts.mkdir()
+    monkeypatch.setattr(train, 'fetch_stock_data', fake_fetch)
+    train.train_single_model('STALE', '2020-01-01', '2024-06-01', 10, 1, 64,
+                             str(artifacts), use_features=True)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(app_module, 'fetch_stock_data', fake_fetch)
+    monkeypatch.setattr(app_module, 'feature_states', {})
+
+    def post(end_date):
+        return client.post("/api/predict", json={
+            "ticker": "STALE", "window": 10, "end_date": end_date})
+
+    assert post("2024-07-01").status_code == 200
+
+    # The incremental download fails (data_loader returns an empty frame)
+    monkeypatch.setattr(app_module, 'fetch_stock_data',
+                        lambda *args: empty_frame())
+    rv = post("2024-07-09")
+    assert rv.status_code == 503
+    assert "error" in rv.get_json()
+
+    # Once the bars arrive the same request succeeds
+    monkeypatch.setattr(app_module, 'fetch_stock_data', fake_fetch)
+    rv = post("2024-07-09")
+    assert rv.status_code == 200
+    assert rv.get_json()["history"][-1]["date"] == "2024-07-08"
+
+
+def test_feature_model_interval(client, tmp_path, monkeypatch, fake_fetch):
+    import app as app_module
+    import train
+
+    artifacts = tmp_path / "model_artifacts"
+    artifacts.mkdir()
+    monkeypatch.setattr(train, 'fetch_stock_data', fake_fetch)
+    train.train_single_model('FEATI', '2020-01-01', '2024-06-01', 10, 1, 64,
+                             str(artifacts), use_features=True)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(app_module, 'fetch_stock_data', fake_fetch)
+    monkeypatch.setattr(app_module, 'feature_states', {})
+
+    rv = client.post("/api/predict", json={
+        "ticker": "FEATI", "window": 10, "end_date": "2024-07-01",
+        "interval_samples": 8, "horizon": 3})
+
+    assert rv.status_code == 200
+    js = rv.get_json()
+    assert js["interval"]["samples"] == 8
+    assert js["interval"]["lower"] <= js["interval"]["upper"]
+    assert len(js["forecast"]) == 3
+
+
+def test_quotes_use_one_scheduled_download(client, monkeypatch, fake_provider):
+    import app as app_module
+
+    provider = fake_provider()
+    monkeypatch.setattr(app_module.fetch_scheduler, 'provider', provider)
+    rv = client.post("/api/quotes", json={"tickers": ["QTA", "QTB", "MISSING"]})
+
+    assert rv.status_code == 200
+    assert [q["ticker"] for q in rv.get_json()] == ["QTA", "QTB"]
+    assert provider.calls == [["QTA", "QTB", "MISSING"]]
+
+
+def test_predict_with_mc_dropout_interval(client, tmp_path, monkeypatch, fake_fetch):
+    import app as app_module
+    import train
+
+    artifacts = tmp_path / "model_artifacts"
+    artifacts.mkdir()
+    monkeypatch.setattr(train, 'fetch_stock_data', fake_fetch)
+    train.train_single_model('MCD', '2020-01-01', '2024-06-01', 10, 1, 64,
+                             str(artifacts))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(app_module, 'fetch_stock_data', fake_fetch)
+
+    def post(**extra):
+        return client.post("/api/predict", json={
+            "ticker": "MCD", "window": 10, "end_date": "2024-07-01", **extra})
+
+    point = post().get_json()
+    assert "interval" not in point
+
+    js = post(interval_samples=32, horizon=3).get_json()
+    interval = js["interval"]
+    assert interval["samples"] == 32 and interval["level"] == 0.9
+    assert interval["lower"] <= interval["upper"]
+    assert np.isclose(interval["width"], interval["upper"] - interval["lower"])
+    # The point estimate is unchanged by sampling
+    assert np.isclose(js["prediction"], point["prediction"])
+    assert all(row["lower"] <= row["upper"] for row in js["forecast"])
+    assert js["forecast"][0]["lower"] == interval["lower"]
+
+    assert post(interval_samples=1000).status_code == 400
+    assert post(interval_samples="x").status_code == 400
+
+    # Intervals are cached under their own key, next to the plain prediction
+    session = app_module.resolve_session("2024-07-01")
+    assert (app_module.generate_cache_key("MCD", 10, session, 1, 32) !=
+            app_module.generate_cache_key("MCD", 10, session, 1))
+    assert (app_module.generate_cache_key("MCD", 10, session, 1, 0) ==
+            app_module.generate_cache_key("MCD", 10, session, 1))
+
+
+def test_resolve_session_clamps_future_end_date():
+    from datetime import date, timedelta
+    import app as app_module
+    from trading_calendar import last_completed_session, previous_session
+
+    completed = last_completed_session()
+    tomorrow = (date.today() + timedelta(days=1)).isoformat()
+    assert app_module.resolve_session(tomorrow) == completed
+    assert app_module.resolve_session('2100-01-01') == completed
+    assert (app_module.resolve_session('2024-07-01') ==
+            previous_session(date(2024, 7, 1)))
+
+
+def test_predict_tolerates_missing_bars(client, tmp_path, monkeypatch, fake_fetch):
+    import app as app_module
+    import train
+
+    artifacts = tmp_path / "model_artifacts"
+    artifacts.mkdir()
+    monkeypatch.setattr(train, 'fetch_stock_data', fake_fetch)
+    train.train_single_model('GAP', '2020-01-01', '2024-06-01', 10, 1, 64,
+                             str(artifacts))
+    monkeypatch.chdir(tmp_path)
+
+    def gappy_fetch(ticker, start, end):
+        df = fake_fetch(ticker, start, end)
+        return df.drop(df.index[-3])  # one session missing from Yahoo
+
+    monkeypatch.setattr(app_module, 'fetch_stock_data', gappy_fetch)
+    rv = client.post("/api/predict", json={
+        "ticker": "GAP", "window": 10, "end_date": "2024-07-01"})
+
+    assert rv.status_code == 200
+    assert len(rv.get_json()["history"]) == 10
+
+
+class DictRedis:
+    """Just enough of redis-py for the prediction cache."""
+
+    def __init__(self):
+        self.data = {}
+        self.ttls = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def mget(self, *keys):
+        return [self.data.get(k) for k in keys]
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+        self.ttls[key] = ttl
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        return []
+
+
+def test_predict_revalidation_returns_304(client, monkeypatch):
+    import app as app_module
+
+    result = {"ticker": "ETAG", "prediction": 101.5,
+              "history": [{"date": "2024-06-28", "close": 100.0}]}
+    calls = []
+
+    def fake_compute(*args):
+        calls.append(args)
+        return result, None, 200
+
+    monkeypatch.setattr(app_module, 'redis_client', DictRedis())
+    monkeypatch.setattr(app_module, 'compute_prediction', fake_compute)
+    payload = {"ticker": "ETAG", "window": 10, "end_date": "2024-07-01"}
+
+    first = client.post("/api/predict", json=payload)
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+    assert etag
+
+    second = client.post("/api/predict", json=payload,
+                         headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert second.data == b''
+    assert second.headers['ETag'] == etag
+    assert len(calls) == 1
+
+
+def test_retrained_model_misses_the_cache(client, tmp_path, monkeypatch):
+    import os
+    import app as app_module
+
+    calls = []
+
+    def fake_compute(*args):
+        calls.append(args)
+        return {"ticker": "VER", "prediction": float(len(calls))}, None, 200
+
+    redis = DictRedis()
+    monkeypatch.setattr(app_module, 'redis_client', redis)
+    monkeypatch.setattr(app_module, 'compute_prediction', fake_compute)
+    monkeypatch.chdir(tmp_path)
+    payload = {"ticker": "VER", "window": 10, "end_date": "2024-07-01"}
+
+    # No local model file (owned by another shard): short TTL
+    client.post("/api/predict", json=payload)
+    assert set(redis.ttls.values()) == {app_module.PREDICTION_CACHE_DURATION}
+
+    (tmp_path / "model_artifacts").mkdir()
+    model_file = tmp_path / "model_artifacts" / "VER_best.h5"
+    model_file.write_bytes(b"v1")
+    os.utime(model_file, (1_700_000_000, 1_700_000_000))
+    assert client.post("/api/predict", json=payload).get_json()["prediction"] == 2
+    assert client.post("/api/predict", json=payload).get_json()["prediction"] == 2
+
+    # Retrain: same path, newer mtime
+    os.utime(model_file, (1_700_086_400, 1_700_086_400))
+    assert client.post("/api/predict", json=payload).get_json()["prediction"] == 3
+    assert len(calls) == 3
+
+
+def test_universe_cache_follows_global_model(client, monkeypatch):
+    import app as app_module
+
+    artifacts = {'meta': {'tickers': ['AAA'], 'window': 10}, 'mtime': 1.0}
+    calls = []
+
+    def fake_run(tickers, session, horizon):
+        calls.append(tickers)
+        return {"predictions": {}, "missing": [], "run": len(calls)}, None, 200
+
+    monkeypatch.setattr(app_module, 'redis_client', DictRedis())
+    monkeypatch.setattr(app_module, 'load_global_artifacts', lambda: artifacts)
+    monkeypatch.setattr(app_module, 'run_global_prediction', fake_run)
+    payload = {"tickers": ["AAA"], "end_date": "2024-07-01"}
+
+    assert client.post("/api/predict/universe", json=payload).get_json()["run"] == 1
+    assert client.post("/api/predict/universe", json=payload).get_json()["run"] == 1
+
+    # train.py --global rewrote the model; the worker reloads it
+    artifacts['mtime'] = 2.0
+    assert client.post("/api/predict/universe", json=payload).get_json()["run"] == 2
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+import cpu_config
+from cpu_config import available_cpus, configure_threads, pin_cpus, thread_plan
+
+
+def test_cgroup_v2_quota_caps_cpus(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, 'sched_getaffinity', lambda pid: set(range(16)))
+    (tmp_path / 'cpu.max').write_text('250000 100000\n')
+    assert available_cpus(str(tmp_path)) == 3
+
+    (tmp_path / 'cpu.max').write_text('max 100000\n')
+    assert available_cpus(str(tmp_path)) == 16
+
+
+def test_cgroup_v1_quota_caps_cpus(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, 'sched_getaffinity', lambda pid: set(range(16)))
+    (tmp_path / 'cpu').mkdir()
+    (tmp_path / 'cpu' / 'cpu.cfs_quota_us').write_text('400000\n')
+    (tmp_path / 'cpu' / 'cpu.cfs_period_us').write_text('100000\n')
+    assert available_cpus(str(tmp_path)) == 4
+
+    (tmp_path / 'cpu' / 'cpu.cfs_quota_us').write_text('-1\n')
+    assert available_cpus(str(tmp_path)) == 16
+
+
+def test_thread_plan_by_role():
+    assert thread_plan('serving', workers=4, cpus=8) == {
+        'cpus': 8, 'intra_op': 2, 'inter_op': 1, 'blas': 2}
+    # More workers than cores still leaves each one thread
+    assert thread_plan('serving', workers=6, cpus=2)['intra_op'] == 1
+    assert thread_plan('training', cpus=8) == {
+        'cpus': 8, 'intra_op': 8, 'inter_op': 2, 'blas': 8}
+    with pytest.raises(ValueError):
+        thread_plan('batch', cpus=8)
+
+
+def test_configure_threads_sets_pools_once(monkeypatch):
+    monkeypatch.setattr(cpu_config, 'current_plan', None)
+    monkeypatch.setattr(cpu_config, 'available_cpus', lambda: 8)
+    for var in cpu_config.THREAD_ENV_VARS + ('TF_NUM_INTEROP_THREADS',):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setenv('WEB_CONCURRENCY', '4')
+
+    plan = configure_threads('serving', pin=False)
+
+    assert plan['intra_op'] == 2
+    assert os.environ['OMP_NUM_THREADS'] == '2'
+    assert os.environ['OPENBLAS_NUM_THREADS'] == '2'
+    assert os.environ['TF_NUM_INTEROP_THREADS'] == '1'
+    assert configure_threads('training') is plan
+
+
+def test_explicit_thread_env_wins(monkeypatch):
+    monkeypatch.setattr(cpu_config, 'current_plan', None)
+    monkeypatch.setattr(cpu_config, 'available_cpus', lambda: 8)
+    monkeypatch.setenv('OMP_NUM_THREADS', '3')
+
+    assert configure_threads('serving', workers=1, pin=False)['intra_op'] == 3
+
+
+@pytest.mark.skipif(not hasattr(os, 'sched_setaffinity'),
+                    reason='CPU affinity is Linux-only')
+def test_pin_cpus_wraps_around_allowed_cores():
+    original = os.sched_getaffinity(0)
+    try:
+        allowed = sorted(original)
+        cores = pin_cpus(worker_index=len(allowed), count=1)
+        assert cores == [allowed[0]]
+        assert os.sched_getaffinity(0) == {allowed[0]}
+    finally:
+        os.sched_setaffinity(0, original)
@@ -0,0 +1,89 @@
+import copy
+
+import numpy as np
+import pandas as pd
+
+from features import (
+    FEATURE_NAMES, WARMUP_BARS, RESUM_INTERVAL, compute_features, FeatureState
+)
+
+
+def create_sample_data(periods=300, seed=42):
+    """Random-walk OHLCV data."""
+    dates = pd.bdate_range('2022-01-03', periods=periods)
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, periods)))
+    return pd.DataFrame({
+        'Open': close * (1 + rng.normal(0, 0.005, periods)),
+        'High': close * (1 + np.abs(rng.normal(0, 0.01, periods))),
+        'Low': close * (1 - np.abs(rng.normal(0, 0.01, periods))),
+        'Close': close,
+        'Volume': rng.integers(1_000_000, 10_000_000, periods).astype(float),
+    }, index=dates)
+
+
+def test_compute_features_shape():
+    """Batch features drop the warm-up rows and contain no NaNs."""
+    df = create_sample_data()
+    features = compute_features(df)
+
+    assert list(features.columns) == FEATURE_NAMES
+    assert len(features) == len(df) - WARMUP_BARS
+    assert features.index[0] == df.index[WARMUP_BARS]
+    assert not features.isna().any().any()
+    np.testing.assert_array_equal(features['close'], df['Close'].iloc[WARMUP_BARS:])
+
+
+def test_streaming_matches_batch():
+    """Bar-by-bar updates reproduce the vectorized training features."""
+    df = create_sample_data()
+    batch = compute_features(df).values
+
+    state = FeatureState(history_size=60)
+    rows = []
+    for date, bar in df.iterrows():
+        row = state.update(bar['Open'], bar['High'], bar['Low'],
+                           bar['Close'], bar['Volume'], date=date)
+        if row is not None:
+            rows.append(row)
+
+    np.testing.assert_allclose(np.array(rows), batch, rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(state.window(), batch[-60:], rtol=1e-9, atol=1e-12)
+    assert list(state.dates) == list(df.index[-60:])
+
+
+def test_incremental_update_frame_matches_full_replay():
+    """Warming up on a prefix and feeding only new bars gives the same state."""
+    df = create_sample_data()
+    full = FeatureState.from_frame(df, history_size=30)
+
+    state = FeatureState.from_frame(df.iloc[:200], history_size=30)
+    # Overlapping frame: already-seen bars must be ignored
+    state.update_frame(df.iloc[150:])
+
+    assert state.ready
+    assert state.last_date == df.index[-1]
+    np.testing.assert_allclose(state.window(), full.window(), rtol=1e-12)
+
+
+def test_long_stream_does_not_drift():
+    """Running sums stay exact over many more bars than the resum interval."""
+    df = create_sample_data(periods=RESUM_INTERVAL * 3, seed=7)
+    state = FeatureState.from_frame(df, history_size=10)
+    batch = compute_features(df).values[-10:]
+
+    np.testing.assert_allclose(state.window(), batch, rtol=1e-9, atol=1e-12)
+
+
+def test_state_is_copyable_for_projection():
+    """A copied state can be advanced without touching the original."""
+    df = create_sample_data()
+    state = FeatureState.from_frame(df, history_size=20)
+    before = state.window().copy()
+
+    projected = copy.deepcopy(state)
+    projected.update(150.0, 150.0, 150.0, 150.0, 5_000_000.0)
+
+    np.testing.assert_array_equal(state.window(), before)
+    assert projected.window()[-1, 0] == 150.0
+    assert projected.last_date == state.last_date
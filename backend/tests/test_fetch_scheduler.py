@@ -0,0 +1,257 @@
+import logging
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from fetch_scheduler import (
+    CircuitOpenError, FetchError, FetchScheduler, YahooProvider
+)
+
+
+def make_scheduler(provider, **kwargs):
+    params = dict(rate=1000, burst=1000, batch_window=0.05, backoff=0.01,
+                  breaker_threshold=100, breaker_cooldown=60)
+    params.update(kwargs)
+    return FetchScheduler(provider, **params)
+
+
+def run_concurrently(fns):
+    results = [None] * len(fns)
+
+    def worker(i, fn):
+        results[i] = fn()
+
+    threads = [threading.Thread(target=worker, args=(i, fn))
+               for i, fn in enumerate(fns)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_identical_requests_are_coalesced(fake_provider):
+    provider = fake_provider(latency=0.1)
+    scheduler = make_scheduler(provider)
+
+    frames = run_concurrently(
+        [lambda: scheduler.fetch('AAPL', '2024-01-01', '2024-02-01')] * 8)
+
+    assert len(provider.calls) == 1
+    assert all(len(df) == 3 for df in frames)
+    assert scheduler.stats['coalesced'] == 7
+
+
+def test_pending_symbols_are_batched_per_range(fake_provider):
+    provider = fake_provider()
+    scheduler = make_scheduler(provider)
+    tickers = ['AAPL', 'MSFT', 'GOOGL', 'MISSING']
+
+    frames = run_concurrently(
+        [lambda t=t: scheduler.fetch(t, period='2d') for t in tickers])
+
+    assert len(provider.calls) == 1
+    assert sorted(provider.calls[0]) == sorted(tickers)
+    # Tickers the provider has no data for come back as empty frames
+    assert frames[-1].empty and list(frames[-1].columns)[3] == 'Close'
+
+    # A different range is a separate download
+    scheduler.fetch('AAPL', period='5d')
+    assert len(provider.calls) == 2
+
+
+def test_batches_are_capped_at_max_batch(fake_provider):
+    provider = fake_provider()
+    scheduler = make_scheduler(provider, max_batch=2)
+
+    frames = scheduler.fetch_many(['A', 'B', 'C', 'D', 'E'], period='2d')
+
+    assert [len(c) for c in provider.calls] == [2, 2, 1]
+    assert set(frames) == {'A', 'B', 'C', 'D', 'E'}
+
+
+def test_rate_limit_spaces_provider_calls(fake_provider):
+    provider = fake_provider()
+    scheduler = make_scheduler(provider, rate=20, burst=1, batch_window=0)
+
+    started = time.monotonic()
+    for days in range(1, 6):
+        scheduler.fetch('AAPL', period=f'{days}d')
+    elapsed = time.monotonic() - started
+
+    assert len(provider.calls) == 5
+    # One token up front, then one every 1/20 s
+    assert elapsed >= 4 / 20 * 0.9
+
+
+class ScriptRedis:
+    """
+    Stand-in for Redis running RedisTokenBucket.SCRIPT: the same bucket
+    arithmetic in Python over one shared hash, serialized like Redis.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+        self.lock = threading.Lock()
+        self.down = False
+
+    def register_script(self, script):
+        def run(keys, args):
+            if self.down:
+                raise ConnectionError("Redis unavailable")
+            rate, burst = float(args[0]), float(args[1])
+            with self.lock:
+                now = time.monotonic()
+                state = self.hashes.setdefault(keys[0], {})
+                tokens = state.get('tokens', burst)
+                at = state.get('at', now)
+                tokens = min(burst, tokens + max(0, now - at) * rate)
+                wait = 0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / rate
+                state.update(tokens=tokens, at=now)
+                return str(wait)
+        return run
+
+
+def test_shared_rate_limit_spans_schedulers(fake_provider):
+    """Two workers sharing the Redis bucket get one budget between them."""
+    redis = ScriptRedis()
+    providers = [fake_provider(), fake_provider()]
+    schedulers = []
+    for provider in providers:
+        # Each worker's local bucket alone would allow all calls at once
+        scheduler = make_scheduler(provider, batch_window=0)
+        scheduler.share_rate_limit(redis, rate=20, burst=1)
+        schedulers.append(scheduler)
+
+    started = time.monotonic()
+    run_concurrently([
+        lambda s=s: [s.fetch('AAPL', period=f'{d}d') for d in range(1, 4)]
+        for s in schedulers
+    ])
+    elapsed = time.monotonic() - started
+
+    assert sum(len(p.calls) for p in providers) == 6
+    assert elapsed >= 5 / 20 * 0.9
+
+    # Redis down: each worker falls back to its own bucket
+    redis.down = True
+    schedulers[0].fetch('AAPL', period='9d')
+    assert len(providers[0].calls) == 4
+
+
+def test_transient_errors_are_retried(fake_provider):
+    provider = fake_provider(failures=2)
+    scheduler = make_scheduler(provider, retries=3)
+
+    df = scheduler.fetch('AAPL', period='2d')
+
+    assert len(df) == 3
+    assert len(provider.calls) == 3
+    assert scheduler.stats['retries'] == 2
+
+
+def test_exhausted_retries_fail_every_waiter(fake_provider):
+    provider = fake_provider(latency=0.05, failures=10)
+    scheduler = make_scheduler(provider, retries=1)
+
+    def fetch():
+        try:
+            scheduler.fetch('AAPL', period='2d')
+        except FetchError as e:
+            return e
+
+    errors = run_concurrently([fetch] * 4)
+
+    assert all(isinstance(e, FetchError) for e in errors)
+    assert len(provider.calls) == 2
+
+
+def test_circuit_breaker_opens_and_recovers(fake_provider):
+    provider = fake_provider(failures=3)
+    scheduler = make_scheduler(provider, retries=0, breaker_threshold=3,
+                               breaker_cooldown=0.2)
+
+    for days in range(3):
+        with pytest.raises(FetchError):
+            scheduler.fetch('AAPL', period=f'{days + 1}d')
+    assert scheduler.circuit_open
+
+    # Open: fail fast without touching the provider
+    with pytest.raises(CircuitOpenError):
+        scheduler.fetch('AAPL', period='2d')
+    assert len(provider.calls) == 3
+
+    # After the cooldown one trial call goes through and closes the circuit
+    time.sleep(0.25)
+    assert len(scheduler.fetch('AAPL', period='2d')) == 3
+    assert not scheduler.circuit_open
+
+
+def test_failed_half_open_trial_reopens_circuit(fake_provider):
+    provider = fake_provider(failures=5)
+    scheduler = make_scheduler(provider, retries=0, breaker_threshold=2,
+                               breaker_cooldown=0.1)
+
+    for _ in range(2):
+        with pytest.raises(FetchError):
+            scheduler.fetch('AAPL', period='2d')
+    time.sleep(0.15)
+    with pytest.raises(FetchError):
+        scheduler.fetch('AAPL', period='2d')
+
+    assert scheduler.circuit_open
+    assert len(provider.calls) == 3
+
+
+def fake_yf_download(errors, frames=()):
+    """yf.download stand-in: logs `errors` the way yfinance does."""
+    def download(tickers, **kwargs):
+        download.calls += 1
+        logger = logging.getLogger('yfinance')
+        for error, symbols in errors.items():
+            logger.error(f"{symbols}: {error}")
+        if not frames:
+            return pd.DataFrame()
+        index = pd.date_range('2024-01-02', periods=2, freq='B')
+        columns = pd.MultiIndex.from_product(
+            [list(frames), ['Open', 'High', 'Low', 'Close', 'Volume']])
+        return pd.DataFrame(1.0, index=index, columns=columns)
+    download.calls = 0
+    return download
+
+
+def test_yahoo_outage_is_retried_and_opens_breaker(monkeypatch):
+    import yfinance
+
+    download = fake_yf_download(
+        {"DNSError('Could not resolve host')": ['AAPL', 'MSFT']})
+    monkeypatch.setattr(yfinance, 'download', download)
+    scheduler = make_scheduler(YahooProvider(), retries=2, breaker_threshold=3)
+
+    with pytest.raises(FetchError):
+        scheduler.fetch_many(['AAPL', 'MSFT'], period='2d')
+
+    assert download.calls == 3
+    assert scheduler.stats['retries'] == 2
+    assert scheduler.circuit_open
+
+
+def test_yahoo_partial_or_missing_data_is_not_a_failure(monkeypatch):
+    import yfinance
+
+    # One ticker failed, the other has data
+    monkeypatch.setattr(yfinance, 'download', fake_yf_download(
+        {"DNSError('Could not resolve host')": ['MSFT']}, frames=['AAPL']))
+    frames = YahooProvider().download(['AAPL', 'MSFT'], period='2d')
+    assert list(frames) == ['AAPL']
+
+    # Unknown symbols are "no data", not an outage
+    monkeypatch.setattr(yfinance, 'download', fake_yf_download(
+        {"YFTzMissingError('possibly delisted; no timezone found')": ['ZZZZ']}))
+    assert YahooProvider().download(['ZZZZ'], period='2d') == {}
@@ -1,6 +1,10 @@
 import numpy as np
 import pandas as pd
-from model import preprocess_data
+import pytest
+from model import (
+    preprocess_data, rollout, stream_global_batches, sample_paths,
+    interval_bounds, has_dropout, stochastic_predict_fn
+)
 
 
 def create_sample_data():
@@ -134,3 +138,88 @@ def test_preprocess_data_data_consistency():
         # If preprocessing fails, that's also acceptable for this test
         # Just make sure we don't get an unexpected error
         assert "insufficient" in str(e).lower() or "window" in str(e).lower()
+
+
+def test_stream_global_batches():
+    """Streamed windows are exact slices of their ticker's series."""
+    series = [np.arange(50, dtype=np.float32),
+              np.arange(1000, 1030, dtype=np.float32)]
+    window_size = 10
+    inputs, y = next(stream_global_batches(series, window_size, 64, seed=1))
+
+    X, ids = inputs["window"], inputs["ticker"]
+    assert X.shape == (64, window_size, 1)
+    assert ids.shape == (64,)
+    assert set(np.unique(ids)) <= {0, 1}
+    for window, target, t in zip(X[..., 0], y, ids):
+        start = int(window[0] - series[t][0])
+        np.testing.assert_array_equal(window, series[t][start:start + window_size])
+        assert target == series[t][start + window_size]
+
+
+def test_rollout_is_batched_and_autoregressive():
+    """n series x h steps take h calls, each feeding back the last output."""
+    calls = []
+
+    def next_value(X):
+        calls.append(X.shape)
+        return X[:, -1, 0] + 1
+
+    windows = np.array([[0, 1, 2], [10, 20, 30]], dtype=np.float32)[..., None]
+    steps = rollout(next_value, windows, horizon=4)
+
+    np.testing.assert_array_equal(steps, [[3, 4, 5, 6], [31, 32, 33, 34]])
+    assert calls == [(2, 3, 1)] * 4
+
+
+def test_rollout_single_step_accepts_feature_windows():
+    """One step on (n, window, f) windows; longer rollouts are refused."""
+    windows = np.ones((8, 5, 3), dtype=np.float32)
+    steps = rollout(lambda X: X[:, -1, 0] * 2, windows, horizon=1)
+
+    np.testing.assert_array_equal(steps, np.full((8, 1), 2))
+    with pytest.raises(ValueError):
+        rollout(lambda X: X[:, -1, 0], windows, horizon=2)
+
+
+def test_sample_paths_tile_one_batch_per_step():
+    """K samples x h steps take h calls of batch K."""
+    calls = []
+    rng = np.random.default_rng(0)
+
+    def noisy(X):
+        calls.append(X.shape)
+        return X[:, -1, 0] + rng.normal(size=len(X))
+
+    window = np.zeros((1, 5, 1), dtype=np.float32)
+    paths = sample_paths(noisy, window, samples=32, horizon=3)
+
+    assert paths.shape == (32, 3)
+    assert calls == [(32, 5, 1)] * 3
+    # Samples diverge: each row got its own noise
+    assert len(np.unique(paths[:, 0])) == 32
+
+
+def test_interval_bounds():
+    paths = np.tile(np.arange(101, dtype=float)[:, None], (1, 2))
+    paths[:, 1] *= 2
+    lower, upper = interval_bounds(paths, level=0.9)
+    np.testing.assert_allclose(lower, [5, 10])
+    np.testing.assert_allclose(upper, [95, 190])
+
+
+def test_mc_dropout_samples_differ_in_one_pass():
+    from train import build_model
+
+    model = build_model(10, dropout=0.5)
+    assert has_dropout(model)
+    assert not has_dropout(build_model(10, dropout=0.0))
+
+    sample_fn = stochastic_predict_fn(model)
+    X = np.repeat(np.random.default_rng(0).random((1, 10, 1)), 16, axis=0)
+    samples = np.asarray(sample_fn(X)).reshape(-1)
+    point = model.predict_on_batch(X).reshape(-1)
+
+    assert len(np.unique(samples)) > 1
+    # Inference without sampling stays deterministic
+    assert len(np.unique(point)) == 1
@@ -0,0 +1,143 @@
+import json
+
+import pytest
+
+import app as app_module
+from app import app
+from profiling import ProfileStore, RequestProfiler
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(app_module, 'PROFILE_TOKEN', 'secret')
+    monkeypatch.setattr(app_module, 'PROFILE_SAMPLE_RATE', 0)
+    monkeypatch.setattr(app_module, 'profile_store', ProfileStore(size=2))
+    app.config['TESTING'] = True
+    with app.test_client() as c:
+        yield c
+
+
+def busy_work():
+    return sum(i * i for i in range(10000))
+
+
+def test_request_profiler_captures_calls():
+    with RequestProfiler() as profiler:
+        busy_work()
+    entry = profiler.entry(path='/x')
+
+    assert entry['path'] == '/x'
+    assert entry['duration_ms'] > 0
+    assert entry['tf_trace'] is None
+    assert 'busy_work' in entry['stats']
+
+
+def test_profile_store_is_a_ring_buffer():
+    store = ProfileStore(size=2)
+    ids = [store.add({'stats': str(i)}) for i in range(3)]
+
+    assert store.get(ids[0]) is None
+    assert store.get(ids[2])['stats'] == '2'
+    assert [e['id'] for e in store.summaries()] == ids[:0:-1]
+    assert 'stats' not in store.summaries()[0]
+
+
+class FakeRedis:
+    """The list commands ProfileStore uses, as decode_responses=True Redis."""
+
+    def __init__(self):
+        self.lists, self.counters = {}, {}
+
+    def incr(self, key):
+        self.counters[key] = self.counters.get(key, 0) + 1
+        return self.counters[key]
+
+    def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, value)
+
+    def lrange(self, key, start, end):
+        items = self.lists.get(key, [])
+        return items[start:] if end == -1 else items[start:end + 1]
+
+    def ltrim(self, key, start, end):
+        self.lists[key] = self.lrange(key, start, end)
+
+    def pipeline(self):
+        redis, calls = self, []
+
+        class Pipeline:
+            def __getattr__(self, name):
+                return lambda *args: calls.append((name, args))
+
+            def execute(self):
+                return [getattr(redis, name)(*args) for name, args in calls]
+        return Pipeline()
+
+
+def test_redis_store_is_shared_between_workers(tmp_path):
+    redis = FakeRedis()
+    worker_a = ProfileStore(size=2, redis_client=redis)
+    worker_b = ProfileStore(size=2, redis_client=redis)
+    trace = tmp_path / "trace"
+    trace.mkdir()
+
+    first = worker_a.add({'stats': 'a', 'tf_trace': str(trace)})
+    second = worker_b.add({'stats': 'b', 'tf_trace': None})
+
+    assert worker_b.get(first)['stats'] == 'a'
+    assert [e['id'] for e in worker_a.summaries()] == [second, first]
+
+    # Trimming to `size` drops the oldest entry and its trace directory
+    third = worker_a.add({'stats': 'c', 'tf_trace': None})
+    assert worker_b.get(first) is None
+    assert not trace.exists()
+    assert [e['id'] for e in worker_b.summaries()] == [third, second]
+
+
+def post_predict(client, headers=None):
+    return client.post(
+        "/api/predict",
+        data=json.dumps({"ticker": "INVALID", "window": 60}),
+        content_type="application/json",
+        headers=headers or {}
+    )
+
+
+def test_predict_is_profiled_only_with_token(client):
+    assert 'X-Profile-Id' not in post_predict(client).headers
+    assert 'X-Profile-Id' not in post_predict(
+        client, {'X-Profile-Token': 'wrong'}).headers
+
+    rv = post_predict(client, {'X-Profile-Token': 'secret'})
+    profile_id = rv.headers['X-Profile-Id']
+
+    listing = client.get('/api/admin/profiles',
+                         headers={'X-Profile-Token': 'secret'}).get_json()
+    assert [p['id'] for p in listing['profiles']] == [int(profile_id)]
+
+    entry = client.get(f'/api/admin/profiles/{profile_id}',
+                       headers={'X-Profile-Token': 'secret'}).get_json()
+    assert entry['path'] == '/api/predict'
+    assert entry['status'] == rv.status_code
+    assert entry['body']['ticker'] == 'INVALID'
+    assert 'run_prediction' in entry['stats']
+
+
+def test_admin_endpoints_require_token(client):
+    assert client.get('/api/admin/profiles').status_code == 403
+    assert client.get('/api/admin/profiles/1', headers={
+        'X-Profile-Token': 'wrong'}).status_code == 403
+    assert client.get('/api/admin/profiles/999', headers={
+        'X-Profile-Token': 'secret'}).status_code == 404
+
+
+def test_sample_rate_profiles_without_header(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'PROFILE_SAMPLE_RATE', 1.0)
+    assert 'X-Profile-Id' in post_predict(client).headers
+
+
+def test_no_token_configured_disables_header(client, monkeypatch):
+    monkeypatch.setattr(app_module, 'PROFILE_TOKEN', None)
+    rv = post_predict(client, {'X-Profile-Token': ''})
+    assert 'X-Profile-Id' not in rv.headers
+    assert client.get('/api/admin/profiles').status_code == 403
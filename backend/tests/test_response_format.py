@@ -0,0 +1,105 @@
+import gzip
+import json
+
+from response_format import (
+    COLUMNAR_MIME, negotiate_format, to_columnar, serialize_result,
+    compute_etag, representation_etag, etag_matches, accepts_gzip, gzip_body
+)
+
+
+def create_sample_result(rows=60):
+    """Create a prediction result shaped like /api/predict output."""
+    history = [
+        {"date": f"2024-01-{(i % 28) + 1:02d}", "close": 100.0 + i}
+        for i in range(rows)
+    ]
+    return {"ticker": "AAPL", "history": history, "prediction": 161.5}
+
+
+def test_negotiate_format():
+    """Body parameter wins over Accept; default is rows."""
+    assert negotiate_format({}, None) == 'rows'
+    assert negotiate_format({}, COLUMNAR_MIME) == 'columnar'
+    assert negotiate_format({"format": "columnar"}, None) == 'columnar'
+    assert negotiate_format({"format": "rows"}, COLUMNAR_MIME) == 'rows'
+    assert negotiate_format({"format": "bogus"}, 'application/json') == 'rows'
+
+
+def test_to_columnar_round_trip():
+    """Columnar arrays carry the same data as the row list."""
+    result = create_sample_result()
+    columnar = to_columnar(result)
+
+    assert 'history' not in columnar
+    assert columnar['ticker'] == 'AAPL'
+    assert columnar['prediction'] == 161.5
+    rebuilt = [{"date": d, "close": c}
+               for d, c in zip(columnar['dates'], columnar['closes'])]
+    assert rebuilt == result['history']
+
+
+def test_columnar_is_smaller():
+    """The columnar layout should not repeat keys per row."""
+    result = create_sample_result()
+    rows = serialize_result(result, 'rows')
+    columnar = serialize_result(result, 'columnar')
+
+    assert json.loads(rows) == result
+    assert len(columnar) < len(rows)
+
+
+def test_etag_is_stable_and_content_derived():
+    """Same payload, same tag; different payload, different tag."""
+    a = serialize_result(create_sample_result())
+    b = serialize_result(create_sample_result(rows=59))
+
+    assert compute_etag(a) == compute_etag(a.decode())
+    assert compute_etag(a) != compute_etag(b)
+
+
+def test_representation_etag_distinguishes_variants():
+    """Each layout/encoding gets its own strong validator."""
+    base = compute_etag(b'{}')
+    tags = {
+        representation_etag(base, 'rows'),
+        representation_etag(base, 'columnar'),
+        representation_etag(base, 'rows', 'gzip'),
+        representation_etag(base, 'columnar', 'gzip'),
+    }
+    assert len(tags) == 4
+    assert all(t.startswith('"') and t.endswith('"') for t in tags)
+
+
+def test_etag_matches():
+    """If-None-Match parsing handles lists, weak tags and wildcard."""
+    etag = '"abc-rows"'
+    assert etag_matches('"abc-rows"', etag)
+    assert etag_matches('"zzz", "abc-rows"', etag)
+    assert etag_matches('W/"abc-rows"', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('"abc-columnar"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches('', etag)
+
+
+def test_accepts_gzip():
+    """Accept-Encoding negotiation respects q=0."""
+    assert accepts_gzip('gzip, deflate, br')
+    assert accepts_gzip('br;q=1.0, gzip;q=0.8')
+    assert accepts_gzip('*')
+    assert not accepts_gzip('gzip;q=0')
+    assert not accepts_gzip('br')
+    assert not accepts_gzip(None)
+    assert accepts_gzip('gzip;q=x')
+    assert accepts_gzip('*;q=0, gzip')
+    assert not accepts_gzip('gzip;q=0, *')
+
+
+def test_gzip_body_is_deterministic():
+    """Compressed bytes must be identical across calls for a strong ETag."""
+    body = serialize_result(create_sample_result(), 'columnar')
+    first = gzip_body(body)
+
+    assert first == gzip_body(body)
+    assert gzip.decompress(first) == body
+    assert len(first) < len(body)
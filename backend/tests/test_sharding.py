@@ -0,0 +1,176 @@
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+
+import requests
+
+from sharding import HashRing, load_members, moved_keys
+
+TICKERS = [f"T{i:03d}" for i in range(1000)]
+NODES = ["http://a:5001", "http://b:5001", "http://c:5001"]
+
+
+def test_ring_is_deterministic_and_balanced():
+    ring = HashRing(NODES)
+    assert ring.nodes == sorted(NODES)
+    assert HashRing(reversed(NODES)).node_for('AAPL') == ring.node_for('AAPL')
+
+    counts = Counter(ring.node_for(t) for t in TICKERS)
+    assert set(counts) == set(NODES)
+    assert max(counts.values()) < 1.5 * len(TICKERS) / len(NODES)
+    assert HashRing().node_for('AAPL') is None
+
+
+def test_membership_change_moves_only_affected_tickers():
+    old = HashRing(NODES)
+    grown = HashRing(NODES + ["http://d:5001"])
+    moves = moved_keys(old, grown, TICKERS)
+
+    # Only tickers taken over by the new node move (~1/4 of them)
+    assert all(new == "http://d:5001" for _, new in moves.values())
+    assert 0.15 < len(moves) / len(TICKERS) < 0.35
+
+    shrunk = HashRing(NODES)
+    shrunk.remove("http://c:5001")
+    moves = moved_keys(old, shrunk, TICKERS)
+    assert all(before == "http://c:5001" for before, _ in moves.values())
+    assert len(moves) == sum(old.node_for(t) == "http://c:5001" for t in TICKERS)
+
+
+def test_load_members(tmp_path):
+    path = tmp_path / "members"
+    path.write_text("# serving nodes\nhttp://a:5001\n\nhttp://b:5001  # spare\n")
+    assert load_members(str(path)) == ["http://a:5001", "http://b:5001"]
+
+
+# Worker process: the real app with the fake Yahoo data from conftest
+WORKER = """
+import sys
+sys.path[:0] = {paths!r}
+import data_loader
+from conftest import fake_prices
+
+class Provider:
+    def download(self, tickers, start=None, end=None, period=None):
+        return {{t: fake_prices(t, start, end) for t in tickers}}
+
+data_loader.scheduler.provider = Provider()
+from app import app
+app.run(host='127.0.0.1', port={port}, threaded=True)
+"""
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_workers(tmp_path, count, members_file):
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    paths = [backend, os.path.join(backend, 'tests')]
+    ports = [free_port() for _ in range(count)]
+    procs = []
+    for port in ports:
+        env = dict(os.environ,
+                   SHARD_SELF=f"http://127.0.0.1:{port}",
+                   SHARD_NODES_FILE=str(members_file),
+                   REDIS_URL="redis://127.0.0.1:1/0",
+                   TF_CPP_MIN_LOG_LEVEL="3")
+        procs.append(subprocess.Popen(
+            [sys.executable, '-c', WORKER.format(paths=paths, port=port)],
+            cwd=tmp_path, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    urls = [f"http://127.0.0.1:{p}" for p in ports]
+
+    deadline = time.time() + 120
+    for url in urls:
+        while True:
+            try:
+                requests.get(f"{url}/api/ping", timeout=1)
+                break
+            except requests.RequestException:
+                if time.time() > deadline:
+                    raise RuntimeError(f"worker {url} did not start")
+                time.sleep(0.5)
+    return urls, procs
+
+
+def set_members(members_file, urls):
+    members_file.write_text("\n".join(urls) + "\n")
+    # Make sure the change is visible even with coarse mtime resolution
+    stamp = time.time() + len(urls)
+    os.utime(members_file, (stamp, stamp))
+
+
+def predict_all(url, tickers):
+    for t in tickers:
+        rv = requests.post(f"{url}/api/predict", timeout=60, json={
+            "ticker": t, "window": 10, "end_date": "2024-07-01"})
+        assert rv.status_code == 200, rv.text
+        assert rv.json()["ticker"] == t
+
+
+def shard_stats(urls):
+    return {url: requests.get(f"{url}/api/shard", timeout=10).json()
+            for url in urls}
+
+
+def test_shards_load_only_owned_models(tmp_path, monkeypatch, fake_fetch):
+    import train
+
+    artifacts = tmp_path / "model_artifacts"
+    artifacts.mkdir()
+    monkeypatch.setattr(train, 'fetch_stock_data', fake_fetch)
+    train.train_single_model('SRC', '2020-01-01', '2024-06-01', 10, 1, 64,
+                             str(artifacts))
+    tickers = [f"SH{i}" for i in range(9)]
+    for name in os.listdir(artifacts):
+        if name.startswith('SRC_'):
+            for t in tickers:
+                shutil.copy(artifacts / name,
+                            artifacts / name.replace('SRC_', f'{t}_'))
+
+    members_file = tmp_path / "members"
+    members_file.write_text("")
+    urls, procs = start_workers(tmp_path, 3, members_file)
+    try:
+        # Two shards first; every request enters through the first node
+        set_members(members_file, urls[:2])
+        predict_all(urls[0], tickers)
+        predict_all(urls[0], tickers)
+
+        ring = HashRing(urls[:2])
+        stats = shard_stats(urls)
+        for url in urls[:2]:
+            owned = {t for t in tickers if ring.node_for(t) == url}
+            cache = stats[url]["model_cache"]
+            assert set(stats[url]["models"]) == owned
+            # One load per owned ticker, every repeat is a cache hit
+            assert cache["misses"] == len(owned)
+            assert cache["hits"] == len(owned)
+            print(f"{url}: {len(owned)} models, "
+                  f"rss {stats[url]['rss_bytes'] / 2**20:.0f} MB, "
+                  f"hit rate {cache['hit_rate']:.0%}")
+            assert stats[url]["rss_bytes"] > 0
+
+        # Third shard joins: it takes over some tickers, the others release them
+        set_members(members_file, urls)
+        predict_all(urls[0], tickers)
+
+        ring = HashRing(urls)
+        stats = shard_stats(urls)
+        for url in urls:
+            owned = {t for t in tickers if ring.node_for(t) == url}
+            assert set(stats[url]["models"]) == owned
+            assert stats[url]["nodes"] == sorted(urls)
+        assert sum(len(s["models"]) for s in stats.values()) == len(tickers)
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait(timeout=30)
@@ -0,0 +1,40 @@
+from snapshot import (
+    VERSION_DIGEST_LEN, item_version, encode_version, decode_version,
+    changed_items
+)
+
+
+def test_item_version_is_order_independent():
+    """Key order must not change an item's hash."""
+    a = {"ticker": "AAPL", "price": 1.0, "change": 0.1, "percent": 0.5}
+    b = {"percent": 0.5, "change": 0.1, "price": 1.0, "ticker": "AAPL"}
+
+    assert item_version(a) == item_version(b)
+    assert len(item_version(a)) == VERSION_DIGEST_LEN
+    assert item_version(a) != item_version({**a, "price": 1.01})
+
+
+def test_version_token_round_trip():
+    """Tokens decode back to the same item map."""
+    versions = {"q:AAPL": "abc123", "p:AAPL": "def456"}
+    token = encode_version(versions)
+
+    assert '=' not in token
+    assert decode_version(token) == versions
+
+
+def test_decode_version_bad_tokens():
+    """Malformed tokens fall back to a full snapshot."""
+    assert decode_version(None) == {}
+    assert decode_version('') == {}
+    assert decode_version('not-base64!!') == {}
+    assert decode_version(encode_version({}).upper() + 'x') == {}
+
+
+def test_changed_items():
+    """Only new or modified items are reported."""
+    since = {"q:AAPL": "1", "q:MSFT": "2", "p:AAPL": "3"}
+    versions = {"q:AAPL": "1", "q:MSFT": "9", "p:AAPL": "3", "q:NVDA": "4"}
+
+    assert changed_items(versions, since) == {"q:MSFT", "q:NVDA"}
+    assert changed_items(versions, {}) == set(versions)
@@ -0,0 +1,86 @@
+from datetime import date, datetime
+
+from trading_calendar import (
+    EXCHANGE_TZ, holidays, is_trading_day, session_close, previous_session,
+    last_completed_session, next_session_close, next_sessions,
+    sessions_ending_at,
+    fetch_range, EARLY_CLOSE
+)
+
+
+def test_holidays_2024():
+    """Rule-generated holidays match the published NYSE 2024 calendar."""
+    expected = {
+        date(2024, 1, 1), date(2024, 1, 15), date(2024, 2, 19),
+        date(2024, 3, 29), date(2024, 5, 27), date(2024, 6, 19),
+        date(2024, 7, 4), date(2024, 9, 2), date(2024, 11, 28),
+        date(2024, 12, 25),
+    }
+    assert holidays(2024) == expected
+
+
+def test_observed_and_special_closures():
+    """Weekend holidays are observed; special closures are included."""
+    assert date(2021, 12, 24) in holidays(2021)   # Christmas on Saturday
+    assert date(2022, 6, 20) in holidays(2022)    # Juneteenth on Sunday
+    assert date(2021, 12, 31) not in holidays(2021)  # New Year on Saturday
+    assert date(2025, 1, 9) in holidays(2025)     # Carter day of mourning
+    assert date(2021, 6, 18) not in holidays(2021)  # before Juneteenth
+
+
+def test_is_trading_day():
+    """Weekends and holidays are not sessions."""
+    assert is_trading_day(date(2024, 7, 3))
+    assert not is_trading_day(date(2024, 7, 4))
+    assert not is_trading_day(date(2024, 7, 6))
+    assert session_close(date(2024, 7, 3)) == EARLY_CLOSE
+
+
+def test_previous_session_skips_weekends_and_holidays():
+    """Tuesday after a Monday holiday maps back to the prior Friday."""
+    assert previous_session(date(2024, 9, 3)) == date(2024, 8, 30)
+    assert previous_session(date(2024, 3, 30)) == date(2024, 3, 28)
+
+
+def test_last_completed_session():
+    """Same evening and weekend requests normalize to one session."""
+    friday = date(2024, 8, 30)
+    during = datetime(2024, 8, 30, 10, 0, tzinfo=EXCHANGE_TZ)
+    evening = datetime(2024, 8, 30, 18, 0, tzinfo=EXCHANGE_TZ)
+    late = datetime(2024, 8, 30, 23, 59, tzinfo=EXCHANGE_TZ)
+    sunday = datetime(2024, 9, 1, 12, 0, tzinfo=EXCHANGE_TZ)
+    labor_day = datetime(2024, 9, 2, 17, 0, tzinfo=EXCHANGE_TZ)
+
+    assert last_completed_session(during) == date(2024, 8, 29)
+    for now in (evening, late, sunday, labor_day):
+        assert last_completed_session(now) == friday
+
+
+def test_sessions_ending_at_and_fetch_range():
+    """Fetch range covers exactly the requested number of bars."""
+    sessions = sessions_ending_at(date(2024, 9, 3), 5)
+    assert sessions == [
+        date(2024, 8, 27), date(2024, 8, 28), date(2024, 8, 29),
+        date(2024, 8, 30), date(2024, 9, 3),
+    ]
+    assert fetch_range(date(2024, 9, 3), 5) == ('2024-08-27', '2024-09-04')
+    assert all(is_trading_day(d) for d in sessions_ending_at(
+        date(2024, 12, 31), 60))
+    assert len(sessions_ending_at(date(2024, 12, 31), 60)) == 60
+
+
+def test_next_session_close():
+    """The next close skips weekends/holidays and honours early closes."""
+    friday_evening = datetime(2024, 8, 30, 18, 0, tzinfo=EXCHANGE_TZ)
+    assert next_session_close(friday_evening) == datetime(
+        2024, 9, 3, 16, 0, tzinfo=EXCHANGE_TZ)
+
+    morning = datetime(2024, 7, 3, 9, 30, tzinfo=EXCHANGE_TZ)
+    assert next_session_close(morning) == datetime(
+        2024, 7, 3, 13, 0, tzinfo=EXCHANGE_TZ)
+
+
+def test_next_sessions():
+    """Forecast dates skip weekends and holidays."""
+    assert next_sessions(date(2024, 8, 29), 3) == [
+        date(2024, 8, 30), date(2024, 9, 3), date(2024, 9, 4)]
@@ -0,0 +1,177 @@
+import json
+
+import numpy as np
+from sklearn.preprocessing import MinMaxScaler
+
+import train
+from train import (
+    artifact_paths, load_metadata, save_metadata, save_replay_sample,
+    scaler_drift, REPLAY_SIZE
+)
+
+
+def test_scaler_drift():
+    """Drift is zero inside the fitted range and relative to it outside."""
+    scaler = MinMaxScaler().fit(np.array([[100.0], [200.0]]))
+
+    assert scaler_drift(scaler, np.array([[120.0], [180.0]])) == 0.0
+    assert abs(scaler_drift(scaler, np.array([[150.0], [230.0]])) - 0.3) < 1e-9
+    assert abs(scaler_drift(scaler, np.array([[50.0]])) - 0.5) < 1e-9
+
+
+def test_metadata_lineage(tmp_path):
+    """Each save appends the run to the parent's lineage."""
+    path = str(tmp_path / 'X_meta.json')
+    assert load_metadata(path) is None
+
+    first = {'mode': 'full', 'start': '2010-01-01', 'end': '2025-01-01',
+             'trained_at': 't0', 'window': 60}
+    save_metadata(path, first)
+    parent = load_metadata(path)
+    save_metadata(path, dict(parent, mode='incremental', start='2025-01-01',
+                             end='2025-02-01', trained_at='t1'), parent=parent)
+
+    meta = load_metadata(path)
+    assert [e['mode'] for e in meta['lineage']] == ['full', 'incremental']
+    assert meta['lineage'][-1]['end'] == '2025-02-01'
+
+
+def test_replay_sample_is_bounded(tmp_path):
+    """Replay buffers never exceed REPLAY_SIZE windows."""
+    path = str(tmp_path / 'X_replay.npz')
+    X = np.zeros((REPLAY_SIZE * 2, 10, 1))
+    y = np.arange(REPLAY_SIZE * 2, dtype=float)
+    save_replay_sample(path, X, y)
+
+    replay = np.load(path)
+    assert replay['X'].shape == (REPLAY_SIZE, 10, 1)
+    assert len(np.unique(replay['y'])) == REPLAY_SIZE
+
+
+def test_incremental_fine_tune(tmp_path, monkeypatch, fake_fetch):
+    """A full run followed by an incremental run records lineage."""
+    monkeypatch.setattr(train, 'fetch_stock_data', fake_fetch)
+    out = str(tmp_path)
+
+    full = train.train_single_model(
+        'TEST', '2020-01-01', '2024-06-01', 10, 1, 64, out)
+    assert full['status'] == 'success'
+
+    # Errors are reported in dollars, as incremental runs report them
+    from model import preprocess_data
+    from tensorflow.keras.models import load_model
+    _, _, X_test, y_test, scaler = preprocess_data(
+        fake_fetch('TEST', '2020-01-01', '2024-06-01'), window_size=10)
+    y_pred = load_model(artifact_paths(out, 'TEST')['final'],
+                        compile=False).predict(X_test, verbose=0)
+    expected = np.sqrt(np.mean((y_test.reshape(-1) - y_pred.reshape(-1)) ** 2))
+    assert np.isclose(full['rmse'], expected * scaler.data_range_[0], rtol=1e-4)
+
+    paths = artifact_paths(out, 'TEST')
+    assert load_metadata(paths['meta'])['mode'] == 'full'
+    assert load_metadata(paths['meta'])['model'] == 'TEST_best.h5'
+
+    # A stale shipped .keras next to the run's .h5 must not be fine-tuned
+    with open(paths['best_keras'], 'wb') as f:
+        f.write(b'shipped')
+
+    result = train.train_incremental_model(
+        'TEST', '2020-01-01', '2024-07-01', 10, 1, 64, out,
+        finetune_epochs=1, replay_ratio=2.0, max_drift=1.0)
+    assert result['status'] == 'success'
+    assert result['mode'] == 'incremental'
+    assert 0 < result['records'] < 30
+
+    meta = load_metadata(paths['meta'])
+    assert meta['end'] == '2024-07-01'
+    assert [e['mode'] for e in meta['lineage']] == ['full', 'incremental']
+    with open(paths['best_keras'], 'rb') as f:
+        assert f.read() == b'shipped'
+
+    again = train.train_incremental_model(
+        'TEST', '2020-01-01', '2024-07-01', 10, 1, 64, out,
+        finetune_epochs=1, replay_ratio=2.0, max_drift=1.0)
+    assert again['status'] == 'skipped'
+
+
+def test_incremental_falls_back_on_drift(tmp_path, monkeypatch, fake_fetch):
+    """Large scaler drift triggers a full retrain."""
+    monkeypatch.setattr(train, 'fetch_stock_data', fake_fetch)
+    out = str(tmp_path)
+    train.train_single_model('TEST', '2020-01-01', '2024-06-01', 10, 1, 64, out)
+
+    def doubled_fetch(ticker, start_date, end_date):
+        df = fake_fetch(ticker, start_date, end_date)
+        df.loc[df.index >= '2024-06-01', 'Close'] *= 2
+        return df
+
+    monkeypatch.setattr(train, 'fetch_stock_data', doubled_fetch)
+    result = train.train_incremental_model(
+        'TEST', '2020-01-01', '2024-12-31', 10, 1, 64, out,
+        finetune_epochs=1, replay_ratio=2.0, max_drift=0.2)
+    meta = load_metadata(artifact_paths(out, 'TEST')['meta'])
+
+    assert result['mode'] == 'full'
+    assert meta['fallback_reason'].startswith('scaler drift')
+
+
+def test_unchanged_job_is_a_cache_hit(tmp_path, monkeypatch, fake_fetch):
+    """Identical inputs skip training; changed hyperparameters do not."""
+    calls = []
+
+    def counting_fetch(ticker, start_date, end_date):
+        calls.append((start_date, end_date))
+        return fake_fetch(ticker, start_date, end_date)
+
+    monkeypatch.setattr(train, 'fetch_stock_data', counting_fetch)
+    out = str(tmp_path)
+
+    first = train.train_single_model(
+        'TEST', '2020-01-01', '2024-06-01', 10, 1, 64, out)
+    second = train.train_single_model(
+        'TEST', '2020-01-01', '2024-06-01', 10, 1, 64, out)
+    third = train.train_single_model(
+        'TEST', '2020-01-01', '2024-06-01', 10, 2, 64, out)
+
+    assert first['cache_hit'] is False
+    assert second['cache_hit'] is True
+    assert second['job_key'] == first['job_key']
+    assert second['rmse'] == first['rmse']
+    assert third['cache_hit'] is False
+    # Historical range: downloaded once, then served from the cache
+    assert len(calls) == 1
+
+    # A different dropout rate is a different architecture
+    monkeypatch.setattr(train, 'MC_DROPOUT', 0.3)
+    fourth = train.train_single_model(
+        'TEST', '2020-01-01', '2024-06-01', 10, 2, 64, out)
+    assert fourth['cache_hit'] is False
+
+
+def test_global_model(tmp_path, monkeypatch, fake_fetch):
+    """One model is trained for all tickers and scored per ticker."""
+    monkeypatch.setattr(train, 'fetch_stock_data', fake_fetch)
+    out = str(tmp_path)
+
+    results = train.train_global_model(
+        ['AAA', 'BBB'], '2020-01-01', '2024-06-01', 10, 1, 64, out)
+    paths = train.global_artifact_paths(out)
+
+    assert [r['ticker'] for r in results] == ['AAA', 'BBB']
+    assert all(r['status'] == 'success' and r['mode'] == 'global'
+               for r in results)
+    assert all(r['per_ticker_rmse'] is None for r in results)
+    with open(paths['meta']) as f:
+        meta = json.load(f)
+    assert meta['tickers'] == ['AAA', 'BBB']
+    assert set(meta['per_ticker']) == {'AAA', 'BBB'}
+
+
+def test_incremental_end_defaults_to_last_session():
+    """Without --end a nightly incremental run covers the latest session."""
+    from datetime import timedelta
+    from trading_calendar import last_completed_session
+
+    expected = last_completed_session() + timedelta(days=1)
+    assert train.default_end_date(True) == expected.strftime('%Y-%m-%d')
+    assert train.default_end_date(False) == train.DEFAULT_END_DATE
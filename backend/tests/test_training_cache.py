@@ -0,0 +1,92 @@
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+from training_cache import (
+    fingerprint_frame, code_fingerprint, job_key, load_cached_download,
+    store_download, load_cached_dataset, store_dataset
+)
+
+
+def create_sample_data():
+    """Small OHLCV frame for fingerprinting."""
+    dates = pd.bdate_range('2023-01-02', periods=50)
+    close = np.linspace(100, 150, 50)
+    return pd.DataFrame({
+        'Open': close, 'High': close + 1, 'Low': close - 1,
+        'Close': close, 'Volume': 1000
+    }, index=dates)
+
+
+def test_fingerprint_frame():
+    """Identical data hashes equal; any value or date change does not."""
+    df = create_sample_data()
+    same = create_sample_data()
+    changed = create_sample_data()
+    changed.iloc[10, 3] += 0.01
+    shifted = create_sample_data()
+    shifted.index = shifted.index + pd.Timedelta(days=1)
+
+    assert fingerprint_frame(df) == fingerprint_frame(same)
+    assert fingerprint_frame(df) != fingerprint_frame(changed)
+    assert fingerprint_frame(df) != fingerprint_frame(shifted)
+
+
+def test_job_key_covers_params_and_code():
+    """Changing hyperparameters or code changes the job key."""
+    code = code_fingerprint(create_sample_data)
+    base = job_key('data', {'window': 60, 'epochs': 20}, code)
+
+    assert base == job_key('data', {'epochs': 20, 'window': 60}, code)
+    assert base != job_key('data', {'window': 60, 'epochs': 21}, code)
+    assert base != job_key('other', {'window': 60, 'epochs': 20}, code)
+    assert base != job_key('data', {'window': 60, 'epochs': 20},
+                           code_fingerprint(fingerprint_frame))
+
+
+def test_download_cache_only_for_historical_ranges(tmp_path):
+    """Ranges that can still change are never cached."""
+    out = str(tmp_path)
+    df = create_sample_data()
+
+    store_download(out, 'TEST', '2023-01-01', '2023-03-31', df)
+    cached = load_cached_download(out, 'TEST', '2023-01-01', '2023-03-31')
+    pd.testing.assert_frame_equal(cached, df)
+
+    store_download(out, 'TEST', '2023-01-01', '2999-01-01', df)
+    assert load_cached_download(out, 'TEST', '2023-01-01', '2999-01-01') is None
+
+
+def test_dataset_round_trip(tmp_path):
+    """Preprocessed arrays and scaler come back unchanged."""
+    out = str(tmp_path)
+    assert load_cached_dataset(out, 'TEST', 'missing') is None
+
+    X = np.random.rand(20, 5, 1)
+    y = np.random.rand(20)
+    scaler = MinMaxScaler().fit(np.array([[1.0], [3.0]]))
+    store_dataset(out, 'TEST', 'key', X[:15], y[:15], X[15:], y[15:], scaler)
+
+    X_train, y_train, X_test, y_test, loaded = load_cached_dataset(out, 'TEST', 'key')
+    np.testing.assert_array_equal(X_train, X[:15])
+    np.testing.assert_array_equal(y_test, y[15:])
+    assert loaded.data_max_[0] == 3.0
+
+
+def test_dataset_replaces_older_entries_per_ticker(tmp_path):
+    """Storing a new dataset prunes that ticker's stale keys only."""
+    out = str(tmp_path)
+    X, y = np.random.rand(10, 5, 1), np.random.rand(10)
+    scaler = MinMaxScaler().fit(np.array([[1.0], [3.0]]))
+
+    store_dataset(out, 'AAA', 'day1', X, y, X, y, scaler)
+    store_dataset(out, 'BBB', 'day1', X, y, X, y, scaler)
+    store_dataset(out, 'AAA', 'day2', X, y, X, y, scaler)
+
+    assert load_cached_dataset(out, 'AAA', 'day1') is None
+    assert load_cached_dataset(out, 'AAA', 'day2') is not None
+    assert load_cached_dataset(out, 'BBB', 'day1') is not None
+    assert sorted(os.listdir(os.path.join(out, '.cache', 'datasets', 'AAA'))) == [
+        'day2.npz', 'day2_scaler.pkl']
@@ -0,0 +1,174 @@
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+# NYSE/Nasdaq session calendar, computed offline from the exchange's
+# holiday rules (no network access needed).
+
+EXCHANGE_TZ = ZoneInfo('America/New_York')
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+
+# One-off closures that no rule can predict (national days of mourning,
+# weather). Keep this table current when the exchange announces a closure.
+SPECIAL_CLOSURES = {
+    date(2001, 9, 11), date(2001, 9, 12), date(2001, 9, 13), date(2001, 9, 14),
+    date(2004, 6, 11),   # Ronald Reagan
+    date(2007, 1, 2),    # Gerald Ford
+    date(2012, 10, 29), date(2012, 10, 30),  # Hurricane Sandy
+    date(2018, 12, 5),   # George H. W. Bush
+    date(2025, 1, 9),    # Jimmy Carter
+}
+
+
+def _easter(year: int) -> date:
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    weekday = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * weekday) // 451
+    month, day = divmod(h + weekday - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th `weekday` (Mon=0) of a month; n=-1 is the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        offset = (weekday - first.weekday()) % 7
+        return first + timedelta(days=offset + 7 * (n - 1))
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    last = next_month - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day: date) -> date:
+    """Saturday holidays move to Friday, Sunday holidays to Monday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def holidays(year: int) -> frozenset:
+    """
+    Full-day exchange holidays for `year`, including special closures.
+    """
+    days = {
+        _nth_weekday(year, 1, 0, 3),        # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),        # Presidents' Day
+        _easter(year) - timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),       # Memorial Day
+        _observed(date(year, 7, 4)),        # Independence Day
+        _nth_weekday(year, 9, 0, 1),        # Labor Day
+        _nth_weekday(year, 11, 3, 4),       # Thanksgiving
+        _observed(date(year, 12, 25)),      # Christmas
+    }
+    # New Year's Day is not moved back into the previous year when it
+    # falls on a Saturday.
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days.add(_observed(new_year))
+    if year >= 2022:
+        days.add(_observed(date(year, 6, 19)))  # Juneteenth
+    days.update(d for d in SPECIAL_CLOSURES if d.year == year)
+    return frozenset(days)
+
+
+def is_trading_day(day: date) -> bool:
+    """True when the exchange holds a session on `day`."""
+    return day.weekday() < 5 and day not in holidays(day.year)
+
+
+def session_close(day: date) -> time:
+    """
+    Closing time (exchange local) of the session on `day`. Early closes:
+    July 3, the day after Thanksgiving and Christmas Eve.
+    """
+    thanksgiving = _nth_weekday(day.year, 11, 3, 4)
+    if day in (date(day.year, 7, 3), thanksgiving + timedelta(days=1),
+               date(day.year, 12, 24)):
+        return EARLY_CLOSE
+    return REGULAR_CLOSE
+
+
+def previous_session(day: date) -> date:
+    """Last trading day strictly before `day`."""
+    day -= timedelta(days=1)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def last_completed_session(now: datetime = None) -> date:
+    """
+    Most recent session whose close has passed at `now` (default: current
+    time). Naive datetimes are taken as exchange local time.
+    """
+    if now is None:
+        now = datetime.now(EXCHANGE_TZ)
+    elif now.tzinfo is not None:
+        now = now.astimezone(EXCHANGE_TZ)
+    today = now.date()
+    if is_trading_day(today) and now.time() >= session_close(today):
+        return today
+    return previous_session(today)
+
+
+def sessions_ending_at(last: date, count: int) -> list:
+    """The `count` trading days ending at (and including) `last`, oldest first."""
+    if count <= 0:
+        return []
+    day = last if is_trading_day(last) else previous_session(last)
+    sessions = [day]
+    while len(sessions) < count:
+        day = previous_session(day)
+        sessions.append(day)
+    return sessions[::-1]
+
+
+def fetch_range(last: date, bars: int) -> tuple:
+    """
+    (start, end) 'YYYY-MM-DD' strings for a Yahoo daily download returning
+    exactly `bars` sessions ending at `last`. `end` is exclusive.
+    """
+    first = sessions_ending_at(last, bars)[0]
+    end = last + timedelta(days=1)
+    return first.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+
+
+def next_session_close(now: datetime = None) -> datetime:
+    """
+    Close (exchange tz-aware) of the first session ending after `now`:
+    the moment `last_completed_session` next changes.
+    """
+    if now is None:
+        now = datetime.now(EXCHANGE_TZ)
+    elif now.tzinfo is None:
+        now = now.replace(tzinfo=EXCHANGE_TZ)
+    else:
+        now = now.astimezone(EXCHANGE_TZ)
+    day = now.date()
+    while True:
+        if is_trading_day(day):
+            close = datetime.combine(day, session_close(day), EXCHANGE_TZ)
+            if close > now:
+                return close
+        day += timedelta(days=1)
+
+
+def next_sessions(day: date, count: int) -> list:
+    """The `count` trading days strictly after `day`, oldest first."""
+    sessions = []
+    while len(sessions) < count:
+        day += timedelta(days=1)
+        if is_trading_day(day):
+            sessions.append(day)
+    return sessions
@@ -1,29 +1,151 @@
 import argparse
+import json
 import os
+from datetime import datetime, timedelta
 import joblib
 import pandas as pd
-from tensorflow.keras.models import Sequential
-from tensorflow.keras.layers import LSTM, Dense
+from tensorflow.keras.models import Sequential, Model, load_model
+from tensorflow.keras.layers import (
+    LSTM, Dense, Dropout, Input, Embedding, RepeatVector, Concatenate
+)
 from tensorflow.keras.callbacks import ModelCheckpoint, EarlyStopping
+from tensorflow.keras.optimizers import Adam
 import numpy as np
 from sklearn.metrics import mean_squared_error, mean_absolute_error
+from sklearn.preprocessing import MinMaxScaler
 
+from cpu_config import configure_threads
 from data_loader import fetch_stock_data
-from model import preprocess_data
-
-
-def build_model(window_size: int) -> Sequential:
+from model import (
+    preprocess_data, preprocess_features, make_windows, stream_global_batches
+)
+from features import FEATURE_NAMES, compute_features
+from trading_calendar import previous_session, fetch_range, last_completed_session
+from training_cache import (
+    fingerprint_frame, code_fingerprint, job_key, load_cached_download,
+    store_download, load_cached_dataset, store_dataset
+)
+
+# Older training windows kept next to each model for incremental replay
+REPLAY_SIZE = 512
+# --end for full runs when none is given
+DEFAULT_END_DATE = '2025-01-01'
+# Dropout rate of per-ticker models; kept active at serving time to sample
+# prediction intervals
+MC_DROPOUT = 0.2
+# Fine-tuning uses a smaller step than the default Adam rate (1e-3)
+FINETUNE_LEARNING_RATE = 1e-4
+
+
+def build_model(window_size: int, n_features: int = 1,
+                dropout: float = MC_DROPOUT) -> Sequential:
     """
-    Build and compile a simple 2-layer LSTM model.
+    Build and compile a simple 2-layer LSTM model. The dropout layers are
+    also what the API samples (MC-dropout) for prediction intervals.
     """
     model = Sequential()
-    model.add(LSTM(50, return_sequences=True, input_shape=(window_size, 1)))
+    model.add(LSTM(50, return_sequences=True,
+                   input_shape=(window_size, n_features)))
+    model.add(Dropout(dropout))
     model.add(LSTM(50))
+    model.add(Dropout(dropout))
     model.add(Dense(1))
     model.compile(optimizer='adam', loss='mse')
     return model
 
 
+def build_global_model(window_size: int, n_tickers: int,
+                       embedding_dim: int = 8) -> Model:
+    """
+    Build and compile one LSTM shared by all tickers. The ticker id is
+    embedded and appended to every timestep so the model can specialise.
+    """
+    window = Input(shape=(window_size, 1), name='window')
+    ticker = Input(shape=(), dtype='int32', name='ticker')
+    embedded = RepeatVector(window_size)(
+        Embedding(n_tickers, embedding_dim)(ticker))
+    x = Concatenate()([window, embedded])
+    x = LSTM(50, return_sequences=True)(x)
+    x = LSTM(50)(x)
+    output = Dense(1)(x)
+    model = Model(inputs={'window': window, 'ticker': ticker}, outputs=output)
+    model.compile(optimizer='adam', loss='mse')
+    return model
+
+
+def global_artifact_paths(output_dir: str) -> dict:
+    """
+    Paths of the shared global model artifacts.
+    """
+    return {
+        'model': os.path.join(output_dir, "global_best.keras"),
+        'scalers': os.path.join(output_dir, "global_scalers.pkl"),
+        'meta': os.path.join(output_dir, "global_meta.json"),
+    }
+
+
+def artifact_paths(output_dir: str, ticker: str) -> dict:
+    """
+    Paths of every artifact kept for `ticker`.
+    """
+    return {
+        'best_keras': os.path.join(output_dir, f"{ticker}_best.keras"),
+        'best_h5': os.path.join(output_dir, f"{ticker}_best.h5"),
+        'final': os.path.join(output_dir, f"{ticker}_final.h5"),
+        'scaler': os.path.join(output_dir, f"{ticker}_scaler.pkl"),
+        'replay': os.path.join(output_dir, f"{ticker}_replay.npz"),
+        'meta': os.path.join(output_dir, f"{ticker}_meta.json"),
+    }
+
+
+def load_metadata(path: str) -> dict:
+    """
+    Load artifact metadata, or None when missing/unreadable.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_metadata(path: str, meta: dict, parent: dict = None):
+    """
+    Write artifact metadata, appending this run to the parent's lineage.
+    """
+    entry = {k: meta[k] for k in ('mode', 'start', 'end', 'trained_at')}
+    lineage = list(parent.get('lineage', [])) if parent else []
+    meta = dict(meta, lineage=lineage + [entry])
+    with open(path, 'w') as f:
+        json.dump(meta, f, indent=2, default=str)
+
+
+def save_replay_sample(path: str, X: np.ndarray, y: np.ndarray, seed: int = 0):
+    """
+    Keep a random sample of at most REPLAY_SIZE training windows.
+    """
+    rng = np.random.default_rng(seed)
+    if len(X) > REPLAY_SIZE:
+        idx = rng.choice(len(X), REPLAY_SIZE, replace=False)
+        X, y = X[idx], y[idx]
+    np.savez_compressed(path, X=X, y=y)
+
+
+def scaler_drift(scaler, close_prices: np.ndarray) -> float:
+    """
+    How far new prices fall outside the scaler's fitted range, as a
+    fraction of that range (0.0 when fully inside).
+    """
+    data_min = float(scaler.data_min_[0])
+    data_max = float(scaler.data_max_[0])
+    span = max(data_max - data_min, 1e-12)
+    above = max(0.0, float(np.max(close_prices)) - data_max)
+    below = max(0.0, data_min - float(np.min(close_prices)))
+    return max(above, below) / span
+
+
 def validate_ticker(ticker: str) -> str:
     """
     Validate and correct ticker symbols.
@@ -39,9 +161,14 @@ def validate_ticker(ticker: str) -> str:
 
 def train_single_model(ticker: str, start_date: str, end_date: str,
                        window_size: int, epochs: int, batch_size: int,
-                       output_dir: str) -> dict:
+                       output_dir: str, fallback_reason: str = None,
+                       force: bool = False, use_features: bool = False) -> dict:
     """
     Train a single model for a ticker and return results.
+    The job is content-addressed: when the data, hyperparameters and
+    model/preprocessing code match the existing artifact, training is
+    skipped (unless `force`). With `use_features` the model is trained on
+    all OHLCV-derived features instead of close only.
     """
     try:
         print(f"\n=== Training model for {ticker} ===")
@@ -52,9 +179,14 @@ def train_single_model(ticker: str, start_date: str, end_date: str,
             print(f"⚠️  Ticker {ticker} mapped to {validated_ticker}")
             ticker = validated_ticker
 
-        # Fetch data
-        print(f"📊 Fetching data for {ticker}...")
-        df = fetch_stock_data(ticker, start_date, end_date)
+        # Fetch data (historical ranges are served from the download cache)
+        df = load_cached_download(output_dir, ticker, start_date, end_date)
+        if df is None:
+            print(f"📊 Fetching data for {ticker}...")
+            df = fetch_stock_data(ticker, start_date, end_date)
+            store_download(output_dir, ticker, start_date, end_date, df)
+        else:
+            print(f"📦 Using cached download for {ticker}")
 
         # Check if we have enough data
         if len(df) < window_size + 100:  # Need at least window_size + some extra for training
@@ -64,14 +196,51 @@ def train_single_model(ticker: str, start_date: str, end_date: str,
 
         print(f"✅ Found {len(df)} records for {ticker}")
 
-        # Preprocess data
-        print(f"🔄 Preprocessing data...")
-        X_train, y_train, X_test, y_test, scaler = preprocess_data(
-            df, window_size=window_size)
+        # Content-address the job and skip it if the artifact is current
+        paths = artifact_paths(output_dir, ticker)
+        data_fp = fingerprint_frame(df)
+        if use_features:
+            preprocess, feature_names = preprocess_features, FEATURE_NAMES
+            code_fp = code_fingerprint(build_model, preprocess_features,
+                                       compute_features, make_windows)
+        else:
+            preprocess, feature_names = preprocess_data, None
+            code_fp = code_fingerprint(build_model, preprocess_data, make_windows)
+        key = job_key(data_fp, {'window': window_size, 'epochs': epochs,
+                                'batch_size': batch_size,
+                                'features': feature_names,
+                                'dropout': MC_DROPOUT}, code_fp)
+        meta = load_metadata(paths['meta'])
+        has_model = any(os.path.exists(paths[k])
+                        for k in ('best_keras', 'best_h5'))
+        if not force and has_model and meta and meta.get('job_key') == key:
+            print(f"⏭️  {ticker} unchanged since {meta['trained_at']} (cache hit)")
+            return {
+                'ticker': ticker,
+                'status': 'success',
+                'mode': meta['mode'],
+                'cache_hit': True,
+                'job_key': key,
+                'rmse': meta['rmse'],
+                'mae': meta['mae'],
+                'records': meta['records']
+            }
+
+        # Preprocess data (reuses a cached dataset after a crash/rerun)
+        dataset_key = job_key(data_fp, {'window': window_size,
+                                        'features': feature_names}, code_fp)
+        dataset = load_cached_dataset(output_dir, ticker, dataset_key)
+        if dataset is None:
+            print("🔄 Preprocessing data...")
+            dataset = preprocess(df, window_size=window_size)
+            store_dataset(output_dir, ticker, dataset_key, *dataset)
+        else:
+            print("📦 Using cached preprocessed dataset")
+        X_train, y_train, X_test, y_test, scaler = dataset
 
         # Build and train model
         print(f"🏗️  Building model...")
-        model = build_model(window_size)
+        model = build_model(window_size, X_train.shape[2], MC_DROPOUT)
 
         best_path = os.path.join(output_dir, f"{ticker}_best.h5")
         checkpoint = ModelCheckpoint(
@@ -93,17 +262,35 @@ def train_single_model(ticker: str, start_date: str, end_date: str,
         rmse = np.sqrt(mean_squared_error(y_test, y_pred))
         mae = mean_absolute_error(y_test, y_pred)
 
-        # Convert to dollar amounts (assuming scaler was fit on close prices)
-        rmse_dollars = rmse * \
-            scaler.scale_[0] if hasattr(scaler, 'scale_') else rmse
-        mae_dollars = mae * \
-            scaler.scale_[0] if hasattr(scaler, 'scale_') else mae
+        # Convert to dollar amounts (the scaler's first column is the close),
+        # in the same units as incremental runs
+        span = float(scaler.data_range_[0])
+        rmse_dollars, mae_dollars = rmse * span, mae * span
 
         # Save final artifacts
-        final_path = os.path.join(output_dir, f"{ticker}_final.h5")
-        scaler_path = os.path.join(output_dir, f"{ticker}_scaler.pkl")
+        final_path = paths['final']
+        scaler_path = paths['scaler']
         model.save(final_path)
         joblib.dump(scaler, scaler_path)
+        save_replay_sample(paths['replay'], X_train, y_train)
+        save_metadata(paths['meta'], {
+            'ticker': ticker,
+            'mode': 'full',
+            'start': start_date,
+            'end': end_date,
+            'window': window_size,
+            'epochs': epochs,
+            'records': len(df),
+            'rmse': float(rmse_dollars),
+            'mae': float(mae_dollars),
+            'trained_at': datetime.now().isoformat(timespec='seconds'),
+            'fallback_reason': fallback_reason,
+            'job_key': key,
+            'data_fingerprint': data_fp,
+            'features': feature_names,
+            'dropout': MC_DROPOUT,
+            'model': os.path.basename(best_path),
+        })
 
         print(f"💾 Saved: {best_path}, {final_path}, {scaler_path}")
         print(
@@ -112,6 +299,9 @@ def train_single_model(ticker: str, start_date: str, end_date: str,
         return {
             'ticker': ticker,
             'status': 'success',
+            'mode': 'full',
+            'cache_hit': False,
+            'job_key': key,
             'rmse': rmse_dollars,
             'mae': mae_dollars,
             'records': len(df)
@@ -122,6 +312,269 @@ def train_single_model(ticker: str, start_date: str, end_date: str,
         return {'ticker': ticker, 'status': 'failed', 'reason': str(e)}
 
 
+def train_incremental_model(ticker: str, start_date: str, end_date: str,
+                            window_size: int, epochs: int, batch_size: int,
+                            output_dir: str, finetune_epochs: int,
+                            replay_ratio: float, max_drift: float,
+                            use_features: bool = False) -> dict:
+    """
+    Warm-start fine-tune an existing model on bars newer than its last
+    training run, mixed with a replay sample of older windows.
+    Falls back to a full retrain when artifacts are missing, the window
+    changed, new prices drift too far outside the scaler range, or the
+    model uses OHLCV features (those are always retrained in full).
+    """
+    ticker = validate_ticker(ticker)
+    paths = artifact_paths(output_dir, ticker)
+    meta = load_metadata(paths['meta'])
+
+    def full_retrain(reason):
+        print(f"↩️  {ticker}: {reason} - falling back to full retrain")
+        return train_single_model(ticker, start_date, end_date, window_size,
+                                  epochs, batch_size, output_dir,
+                                  fallback_reason=reason,
+                                  use_features=use_features)
+
+    # Fine-tune the exact file the last run produced (a shipped
+    # <ticker>_best.keras may predate this run's scaler and replay sample)
+    if meta is None or not meta.get('model'):
+        return full_retrain('no previous artifact metadata')
+    model_path = os.path.join(output_dir, meta['model'])
+    if not os.path.exists(model_path):
+        return full_retrain(f"recorded model {meta['model']} missing")
+    if not (os.path.exists(paths['scaler']) and os.path.exists(paths['replay'])):
+        return full_retrain('scaler or replay sample missing')
+    if use_features or meta.get('features'):
+        return full_retrain('feature models are retrained in full')
+    if meta.get('window') != window_size:
+        return full_retrain(
+            f"window changed ({meta.get('window')} -> {window_size})")
+
+    last_end = meta['end']
+    if last_end >= end_date:
+        print(f"⏭️  {ticker} already trained up to {last_end}")
+        return {'ticker': ticker, 'status': 'skipped', 'reason': 'up_to_date'}
+
+    try:
+        print(f"\n=== Fine-tuning {ticker} ({last_end} -> {end_date}) ===")
+
+        # Only new bars, plus one window of context before the first one
+        context_end = previous_session(
+            datetime.strptime(last_end, '%Y-%m-%d').date())
+        fetch_start, _ = fetch_range(context_end, window_size)
+        df = fetch_stock_data(ticker, fetch_start, end_date)
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = df.columns.get_level_values(0)
+
+        is_new = df.index[window_size:] >= pd.Timestamp(last_end)
+        if len(df) <= window_size or not is_new.any():
+            print(f"⏭️  No new bars for {ticker} since {last_end}")
+            return {'ticker': ticker, 'status': 'skipped',
+                    'reason': 'no_new_bars'}
+
+        scaler = joblib.load(paths['scaler'])
+        close_prices = df['Close'].values.reshape(-1, 1)
+        new_prices = close_prices[window_size:][is_new]
+        drift = scaler_drift(scaler, new_prices)
+        if drift > max_drift:
+            return full_retrain(f"scaler drift {drift:.1%} > {max_drift:.0%}")
+
+        X_all, y_all = make_windows(scaler.transform(close_prices), window_size)
+        X_new, y_new = X_all[is_new], y_all[is_new]
+
+        replay = np.load(paths['replay'])
+        n_replay = min(len(replay['X']), int(len(X_new) * replay_ratio))
+        rng = np.random.default_rng(len(meta.get('lineage', [])))
+        idx = rng.choice(len(replay['X']), n_replay, replace=False)
+        X_fit = np.concatenate([X_new, replay['X'][idx]])
+        y_fit = np.concatenate([y_new, replay['y'][idx]])
+
+        print(f"🔁 {len(X_new)} new windows + {n_replay} replay windows, "
+              f"drift {drift:.1%}")
+        model = load_model(model_path, compile=False)
+        model.compile(optimizer=Adam(learning_rate=FINETUNE_LEARNING_RATE),
+                      loss='mse')
+        model.fit(X_fit, y_fit, epochs=finetune_epochs,
+                  batch_size=batch_size, shuffle=True, verbose=1)
+
+        # Evaluate on the new bars only
+        y_pred = model.predict(X_new)
+        rmse = np.sqrt(mean_squared_error(y_new, y_pred))
+        mae = mean_absolute_error(y_new, y_pred)
+        span = float(scaler.data_range_[0])
+        rmse_dollars, mae_dollars = rmse * span, mae * span
+
+        model.save(model_path)
+        save_replay_sample(
+            paths['replay'],
+            np.concatenate([replay['X'], X_new]),
+            np.concatenate([replay['y'], y_new]),
+            seed=len(meta.get('lineage', [])) + 1)
+        save_metadata(paths['meta'], dict(
+            meta,
+            mode='incremental',
+            start=last_end,
+            end=end_date,
+            records=int(meta.get('records', 0)) + int(is_new.sum()),
+            rmse=float(rmse_dollars),
+            mae=float(mae_dollars),
+            scaler_drift=drift,
+            trained_at=datetime.now().isoformat(timespec='seconds'),
+            fallback_reason=None,
+            job_key=None,
+        ), parent=meta)
+
+        print(f"💾 Updated: {model_path}, {paths['replay']}, {paths['meta']}")
+        print(f"📈 New-bar performance - RMSE: ${rmse_dollars:.2f}, "
+              f"MAE: ${mae_dollars:.2f}")
+
+        return {
+            'ticker': ticker,
+            'status': 'success',
+            'mode': 'incremental',
+            'cache_hit': False,
+            'rmse': rmse_dollars,
+            'mae': mae_dollars,
+            'records': int(is_new.sum())
+        }
+
+    except Exception as e:
+        print(f"❌ Error fine-tuning {ticker}: {str(e)}")
+        return {'ticker': ticker, 'status': 'failed', 'reason': str(e)}
+
+
+def evaluate_per_ticker_model(ticker: str, close_prices: np.ndarray,
+                              split: int, window_size: int,
+                              output_dir: str) -> float:
+    """
+    RMSE (dollars) of the existing per-ticker model on the same test
+    windows the global model is scored on, or None if it is missing.
+    """
+    paths = artifact_paths(output_dir, ticker)
+    model_path = next((p for p in (paths['best_keras'], paths['best_h5'])
+                       if os.path.exists(p)), None)
+    if model_path is None or not os.path.exists(paths['scaler']):
+        return None
+    scaler = joblib.load(paths['scaler'])
+    X, y = make_windows(scaler.transform(close_prices)[split:], window_size)
+    y_pred = load_model(model_path, compile=False).predict(X, verbose=0)
+    return float(np.sqrt(mean_squared_error(y, y_pred)) * scaler.data_range_[0])
+
+
+def train_global_model(tickers: list, start_date: str, end_date: str,
+                       window_size: int, epochs: int, batch_size: int,
+                       output_dir: str, embedding_dim: int = 8,
+                       split_ratio: float = 0.8) -> list:
+    """
+    Train one model for all tickers on windows streamed across them, with
+    per-ticker MinMax normalization. Returns one result dict per ticker,
+    including the RMSE difference against its per-ticker model if present.
+    """
+    vocab, closes, scalers, splits = [], [], {}, []
+    train_series, test_series = [], []
+    results = []
+
+    for ticker in dict.fromkeys(validate_ticker(t) for t in tickers):
+        df = load_cached_download(output_dir, ticker, start_date, end_date)
+        if df is None:
+            print(f"📊 Fetching data for {ticker}...")
+            df = fetch_stock_data(ticker, start_date, end_date)
+            store_download(output_dir, ticker, start_date, end_date, df)
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = df.columns.get_level_values(0)
+        if 'Close' not in df.columns or len(df) < window_size + 100:
+            print(f"❌ Insufficient data for {ticker}. Skipping...")
+            results.append({'ticker': ticker, 'status': 'failed',
+                            'reason': 'insufficient_data'})
+            continue
+
+        close_prices = df['Close'].values.reshape(-1, 1)
+        scaler = MinMaxScaler()
+        scaled = scaler.fit_transform(close_prices)[:, 0].astype(np.float32)
+        # Same split point preprocess_data uses for per-ticker models
+        split = int((len(scaled) - window_size) * split_ratio)
+
+        vocab.append(ticker)
+        closes.append(close_prices)
+        scalers[ticker] = scaler
+        splits.append(split)
+        train_series.append(scaled[:split + window_size])
+        test_series.append(scaled[split:])
+
+    if not vocab:
+        return results
+
+    n_train = sum(len(s) - window_size for s in train_series)
+    n_test = sum(len(s) - window_size for s in test_series)
+    print(f"🌐 Training global model on {len(vocab)} tickers, "
+          f"{n_train} train / {n_test} test windows")
+
+    paths = global_artifact_paths(output_dir)
+    model = build_global_model(window_size, len(vocab), embedding_dim)
+    checkpoint = ModelCheckpoint(
+        paths['model'], save_best_only=True, monitor='val_loss')
+    early_stop = EarlyStopping(patience=5, restore_best_weights=True)
+    model.fit(
+        stream_global_batches(train_series, window_size, batch_size, seed=0),
+        steps_per_epoch=max(1, n_train // batch_size),
+        validation_data=stream_global_batches(
+            test_series, window_size, batch_size, seed=1),
+        validation_steps=max(1, n_test // batch_size),
+        epochs=epochs,
+        callbacks=[checkpoint, early_stop],
+        verbose=1
+    )
+    model.save(paths['model'])
+    joblib.dump(scalers, paths['scalers'])
+
+    # Score each ticker on its own test windows, one ticker at a time
+    per_ticker = {}
+    for i, ticker in enumerate(vocab):
+        X, y = make_windows(test_series[i].reshape(-1, 1), window_size)
+        ids = np.full(len(X), i, dtype=np.int32)
+        y_pred = model.predict({'window': X, 'ticker': ids}, verbose=0)
+        span = float(scalers[ticker].data_range_[0])
+        rmse = float(np.sqrt(mean_squared_error(y, y_pred)) * span)
+        mae = float(mean_absolute_error(y, y_pred) * span)
+        baseline = evaluate_per_ticker_model(
+            ticker, closes[i], splits[i], window_size, output_dir)
+        per_ticker[ticker] = {
+            'rmse': rmse,
+            'mae': mae,
+            'per_ticker_rmse': baseline,
+            'rmse_diff': None if baseline is None else rmse - baseline,
+        }
+        results.append(dict(per_ticker[ticker], ticker=ticker,
+                            status='success', mode='global',
+                            records=len(closes[i])))
+
+    with open(paths['meta'], 'w') as f:
+        json.dump({
+            'tickers': vocab,
+            'window': window_size,
+            'embedding_dim': embedding_dim,
+            'start': start_date,
+            'end': end_date,
+            'epochs': epochs,
+            'per_ticker': per_ticker,
+            'trained_at': datetime.now().isoformat(timespec='seconds'),
+        }, f, indent=2)
+
+    print(f"💾 Saved: {paths['model']}, {paths['scalers']}, {paths['meta']}")
+    return results
+
+
+def default_end_date(incremental: bool) -> str:
+    """
+    `--end` when none is given. Incremental runs go through the last
+    completed session (the end date is exclusive), so a nightly job picks
+    up the new bars without passing a date.
+    """
+    if not incremental:
+        return DEFAULT_END_DATE
+    return (last_completed_session() + timedelta(days=1)).strftime('%Y-%m-%d')
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Train LSTM models for stock prediction")
@@ -134,8 +587,9 @@ def main():
         help='Start date YYYY-MM-DD'
     )
     parser.add_argument(
-        '--end', type=str, default='2025-01-01',
-        help='End date YYYY-MM-DD'
+        '--end', type=str, default=None,
+        help=f'End date YYYY-MM-DD (exclusive; default {DEFAULT_END_DATE}, '
+             'or through the last completed session with --incremental)'
     )
     parser.add_argument(
         '--window', type=int, default=60,
@@ -153,7 +607,49 @@ def main():
         '--output_dir', type=str, default='model_artifacts',
         help='Directory to save models and scalers'
     )
+    parser.add_argument(
+        '--force', action='store_true',
+        help='Retrain even when an artifact for identical inputs exists'
+    )
+    parser.add_argument(
+        '--incremental', action='store_true',
+        help='Fine-tune existing models on bars newer than their last run'
+    )
+    parser.add_argument(
+        '--global', dest='global_model', action='store_true',
+        help='Train one shared model for all tickers (ticker embedding input)'
+    )
+    parser.add_argument(
+        '--embedding_dim', type=int, default=8,
+        help='Ticker embedding size for --global'
+    )
+    parser.add_argument(
+        '--finetune_epochs', type=int, default=3,
+        help='Epochs per incremental fine-tune'
+    )
+    parser.add_argument(
+        '--replay_ratio', type=float, default=4.0,
+        help='Replayed old windows per new window when fine-tuning'
+    )
+    parser.add_argument(
+        '--max_drift', type=float, default=0.2,
+        help='Max out-of-range price move (fraction of scaler range) '
+             'before an incremental run falls back to a full retrain'
+    )
+    parser.add_argument(
+        '--features', action='store_true',
+        help='Train on OHLCV-derived features (returns, volatility, volume, '
+             'moving averages) instead of close only'
+    )
     args = parser.parse_args()
+    if args.end is None:
+        args.end = default_end_date(args.incremental)
+
+    # Training owns the machine's cores; size TF/BLAS pools before any op
+    configure_threads('training')
+
+    if args.features and args.global_model:
+        parser.error('--features is not supported with --global yet')
 
     # Ensure output directory exists
     os.makedirs(args.output_dir, exist_ok=True)
@@ -161,6 +657,7 @@ def main():
     # Track results
     results = []
     successful = []
+    skipped = []
     failed = []
 
     print(f"🎯 Starting batch training for {len(args.tickers)} tickers...")
@@ -168,15 +665,34 @@ def main():
     print(
         f"⚙️  Parameters: window={args.window}, epochs={args.epochs}, batch_size={args.batch_size}")
 
-    for ticker in args.tickers:
-        result = train_single_model(
-            ticker, args.start, args.end, args.window,
-            args.epochs, args.batch_size, args.output_dir
+    if args.global_model:
+        results = train_global_model(
+            args.tickers, args.start, args.end, args.window,
+            args.epochs, args.batch_size, args.output_dir,
+            embedding_dim=args.embedding_dim
         )
-        results.append(result)
-
+    else:
+        for ticker in args.tickers:
+            if args.incremental:
+                result = train_incremental_model(
+                    ticker, args.start, args.end, args.window,
+                    args.epochs, args.batch_size, args.output_dir,
+                    args.finetune_epochs, args.replay_ratio, args.max_drift,
+                    use_features=args.features
+                )
+            else:
+                result = train_single_model(
+                    ticker, args.start, args.end, args.window,
+                    args.epochs, args.batch_size, args.output_dir,
+                    force=args.force, use_features=args.features
+                )
+            results.append(result)
+
+    for result in results:
         if result['status'] == 'success':
             successful.append(result)
+        elif result['status'] == 'skipped':
+            skipped.append(result)
         else:
             failed.append(result)
 
@@ -184,15 +700,28 @@ def main():
     print("\n" + "="*60)
     print("TRAINING SUMMARY")
     print("="*60)
+    cache_hits = [r for r in successful if r.get('cache_hit')]
+
     print(f"Total tickers: {len(args.tickers)}")
-    print(f"Successful: {len(successful)}")
+    print(f"Successful: {len(successful)} ({len(cache_hits)} cache hits)")
+    print(f"Skipped: {len(skipped)}")
     print(f"Failed: {len(failed)}")
 
     if successful:
         print(f"\n✅ Successfully trained models:")
         for result in successful:
+            cached = ', cached' if result.get('cache_hit') else ''
+            diff = ''
+            if result.get('rmse_diff') is not None:
+                diff = f", vs per-ticker {result['rmse_diff']:+.2f}"
             print(
-                f"   {result['ticker']}: RMSE=${result['rmse']:.2f}, MAE=${result['mae']:.2f}")
+                f"   {result['ticker']} ({result['mode']}{cached}): "
+                f"RMSE=${result['rmse']:.2f}, MAE=${result['mae']:.2f}{diff}")
+
+    if skipped:
+        print("\n⏭️  Skipped tickers:")
+        for result in skipped:
+            print(f"   {result['ticker']}: {result['reason']}")
 
     if failed:
         print(f"\n❌ Failed tickers:")
@@ -205,21 +734,51 @@ def main():
         f.write("TRAINING SUMMARY\n")
         f.write("="*50 + "\n")
         f.write(f"Total tickers: {len(args.tickers)}\n")
-        f.write(f"Successful: {len(successful)}\n")
+        f.write(
+            f"Successful: {len(successful)} ({len(cache_hits)} cache hits)\n")
+        f.write(f"Skipped: {len(skipped)}\n")
         f.write(f"Failed: {len(failed)}\n\n")
 
         if successful:
             f.write("Successful models:\n")
             for result in successful:
+                cached = ', cached' if result.get('cache_hit') else ''
                 f.write(
-                    f"  {result['ticker']}: RMSE=${result['rmse']:.2f}, MAE=${result['mae']:.2f}\n")
+                    f"  {result['ticker']} ({result['mode']}{cached}): "
+                    f"RMSE=${result['rmse']:.2f}, MAE=${result['mae']:.2f}\n")
+
+        if skipped:
+            f.write("\nSkipped tickers:\n")
+            for result in skipped:
+                f.write(f"  {result['ticker']}: {result['reason']}\n")
 
         if failed:
             f.write("\nFailed tickers:\n")
             for result in failed:
                 f.write(f"  {result['ticker']}: {result['reason']}\n")
 
-    print(f"\n📄 Training summary saved to: {summary_path}")
+    # Machine-readable summary next to the text one
+    json_summary_path = os.path.join(args.output_dir, "training_summary.json")
+    with open(json_summary_path, 'w') as f:
+        json.dump({
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'parameters': {
+                'start': args.start, 'end': args.end, 'window': args.window,
+                'epochs': args.epochs, 'batch_size': args.batch_size,
+                'incremental': args.incremental, 'force': args.force,
+                'global': args.global_model, 'features': args.features,
+            },
+            'totals': {
+                'tickers': len(args.tickers),
+                'successful': len(successful),
+                'cache_hits': len(cache_hits),
+                'skipped': len(skipped),
+                'failed': len(failed),
+            },
+            'results': results,
+        }, f, indent=2, default=float)
+
+    print(f"\n📄 Training summary saved to: {summary_path}, {json_summary_path}")
     print("Training completed!")
 
 
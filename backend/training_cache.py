@@ -0,0 +1,141 @@
+import hashlib
+import inspect
+import json
+import os
+from datetime import datetime
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from trading_calendar import last_completed_session
+
+# Bump when a change outside the fingerprinted functions (e.g. the
+# checkpoint/selection logic in train.py) should invalidate old jobs.
+CACHE_SCHEMA_VERSION = 1
+
+
+def cache_dir(output_dir: str) -> str:
+    """
+    Directory holding cached downloads and preprocessed datasets.
+    """
+    path = os.path.join(output_dir, '.cache')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _digest(*parts) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, bytes):
+            part = json.dumps(part, sort_keys=True, default=str).encode()
+        h.update(part)
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def fingerprint_frame(df: pd.DataFrame) -> str:
+    """
+    Content hash of a price DataFrame (index and values).
+    """
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = df.columns.get_level_values(0)
+    hashed = pd.util.hash_pandas_object(df, index=True).values
+    return _digest(list(df.columns), hashed.tobytes())
+
+
+def code_fingerprint(*funcs) -> str:
+    """
+    Hash of the source of the functions that define a training job
+    (model architecture, preprocessing), so editing them invalidates
+    cached results.
+    """
+    return _digest(CACHE_SCHEMA_VERSION,
+                   *[inspect.getsource(f) for f in funcs])
+
+
+def job_key(data_fingerprint: str, params: dict, code: str) -> str:
+    """
+    Content address of a training job.
+    """
+    return _digest(data_fingerprint, params, code)
+
+
+def _download_path(output_dir, ticker, start_date, end_date):
+    name = f"{ticker}_{start_date}_{end_date}.pkl"
+    return os.path.join(cache_dir(output_dir), 'downloads', name)
+
+
+def is_historical(end_date: str) -> bool:
+    """
+    True when every session before the (exclusive) `end_date` has closed,
+    so the downloaded range can no longer change.
+    """
+    end = datetime.strptime(end_date, '%Y-%m-%d').date()
+    return end <= last_completed_session()
+
+
+def load_cached_download(output_dir, ticker, start_date, end_date):
+    """
+    Cached price data for a fully historical range, or None.
+    """
+    path = _download_path(output_dir, ticker, start_date, end_date)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_pickle(path)
+    except Exception:
+        return None
+
+
+def store_download(output_dir, ticker, start_date, end_date, df):
+    """
+    Cache a download, but only when its range can no longer change.
+    """
+    if df.empty or not is_historical(end_date):
+        return
+    path = _download_path(output_dir, ticker, start_date, end_date)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df.to_pickle(path)
+
+
+def _dataset_paths(output_dir, ticker, key):
+    base = os.path.join(cache_dir(output_dir), 'datasets', ticker, key)
+    return f"{base}.npz", f"{base}_scaler.pkl"
+
+
+def load_cached_dataset(output_dir, ticker, key):
+    """
+    (X_train, y_train, X_test, y_test, scaler) for a dataset key, or None.
+    """
+    arrays_path, scaler_path = _dataset_paths(output_dir, ticker, key)
+    if not (os.path.exists(arrays_path) and os.path.exists(scaler_path)):
+        return None
+    try:
+        arrays = np.load(arrays_path)
+        return (arrays['X_train'], arrays['y_train'],
+                arrays['X_test'], arrays['y_test'], joblib.load(scaler_path))
+    except Exception:
+        return None
+
+
+def store_dataset(output_dir, ticker, key, X_train, y_train, X_test, y_test,
+                  scaler):
+    """
+    Cache a preprocessed dataset, replacing the ticker's older entries
+    (each new trading day changes the key). The arrays are written first;
+    the scaler file marks the entry complete.
+    """
+    arrays_path, scaler_path = _dataset_paths(output_dir, ticker, key)
+    ticker_dir = os.path.dirname(arrays_path)
+    os.makedirs(ticker_dir, exist_ok=True)
+    for name in os.listdir(ticker_dir):
+        if not name.startswith(key):
+            try:
+                os.remove(os.path.join(ticker_dir, name))
+            except OSError:
+                pass
+    np.savez(arrays_path, X_train=X_train, y_train=y_train,
+             X_test=X_test, y_test=y_test)
+    joblib.dump(scaler, scaler_path)
@@ -1,6 +1,6 @@
 // File: frontend/src/App.js
 
-import React, { useState, useEffect } from "react";
+import React, { useState, useEffect, useCallback } from "react";
 import {
   Container,
   Box,
@@ -11,7 +11,7 @@ import {
   Divider,
 } from "@mui/material";
 
-import { getPrediction } from "./services/api";
+import { getSnapshot } from "./services/api";
 import { ThemeContextProvider } from "./contexts/ThemeContext";
 import Header from "./components/Header";
 import SymbolPicker from "./components/SymbolPicker";
@@ -19,6 +19,9 @@ import PredictionChart from "./components/PredictionChart";
 import PredictionResults from "./components/PredictionResults";
 import PriceBoard from "./components/PriceBoard";
 
+const BOARD_TICKERS = ["AAPL", "MSFT", "GOOGL", "TSLA", "AMZN", "NVDA"];
+const POLL_INTERVAL = 30_000; // quotes + prediction in one snapshot request
+
 // Helper function to get next trading day - simplified approach
 const getNextTradingDay = () => {
   const today = new Date();
@@ -50,23 +53,47 @@ function AppContent() {
   const [predPoint, setPredPoint] = useState(null);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState(null);
+  const [quotes, setQuotes] = useState([]);
+  const [quotesLoading, setQuotesLoading] = useState(false);
+  const [lastUpdated, setLastUpdated] = useState(null);
+
+  // One snapshot request for the price board and the selected ticker
+  const refresh = useCallback(async (sym) => {
+    setQuotesLoading(true);
+    try {
+      const snapshot = await getSnapshot(BOARD_TICKERS, sym ? [sym] : []);
+      setQuotes(snapshot.quotes);
+      setLastUpdated(new Date());
+      return sym ? snapshot.predictions[sym] : null;
+    } finally {
+      setQuotesLoading(false);
+    }
+  }, []);
+
+  const showPrediction = useCallback((result) => {
+    const { history: hist, prediction } = result;
+
+    // Get the next trading day from today
+    const nextTradingDay = getNextTradingDay();
+    const nextDate = nextTradingDay.toISOString().split("T")[0];
+
+    console.log("Setting prediction date:", nextDate);
+    console.log("Last historical date:", hist[hist.length - 1]?.date);
+
+    setHistory(hist);
+    setPredPoint({ date: nextDate, close: prediction });
+  }, []);
 
   const handlePredict = async (sym) => {
     setTicker(sym);
     setLoading(true);
     setError(null);
     try {
-      const { history: hist, prediction } = await getPrediction(sym);
-
-      // Get the next trading day from today
-      const nextTradingDay = getNextTradingDay();
-      const nextDate = nextTradingDay.toISOString().split("T")[0];
-
-      console.log("Setting prediction date:", nextDate);
-      console.log("Last historical date:", hist[hist.length - 1]?.date);
-
-      setHistory(hist);
-      setPredPoint({ date: nextDate, close: prediction });
+      const result = await refresh(sym);
+      if (!result || result.error) {
+        throw new Error(result?.error || "No prediction returned");
+      }
+      showPrediction(result);
     } catch (err) {
       console.error(err);
       setError("Failed to fetch prediction. Please try again.");
@@ -75,12 +102,24 @@ function AppContent() {
     }
   };
 
-  // Poll every minute when a ticker is set
+  // Poll for the board (and the selected ticker's prediction, if any)
+  const pollSnapshot = useCallback(async () => {
+    try {
+      const result = await refresh(ticker);
+      if (result && !result.error) {
+        showPrediction(result);
+      }
+    } catch (err) {
+      console.error("Snapshot error:", err);
+    }
+  }, [ticker, refresh, showPrediction]);
+
+  // handlePredict already fetched a newly picked ticker
   useEffect(() => {
-    if (!ticker) return;
-    const id = setInterval(() => handlePredict(ticker), 60_000);
+    if (!ticker) pollSnapshot();
+    const id = setInterval(pollSnapshot, POLL_INTERVAL);
     return () => clearInterval(id);
-  }, [ticker]);
+  }, [ticker, pollSnapshot]);
 
   return (
     <Box sx={{ minHeight: "100vh", pb: 4 }}>
@@ -196,7 +235,10 @@ function AppContent() {
         {/* Live Market Prices Section */}
         <Box sx={{ mb: 4 }}>
           <PriceBoard
-            tickers={["AAPL", "MSFT", "GOOGL", "TSLA", "AMZN", "NVDA"]}
+            quotes={quotes}
+            loading={quotesLoading}
+            lastUpdated={lastUpdated}
+            onRefresh={pollSnapshot}
           />
         </Box>
       </Container>
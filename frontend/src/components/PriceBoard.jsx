@@ -1,5 +1,5 @@
 // File: frontend/src/components/PriceBoard.jsx
-import React, { useState, useEffect, useCallback } from 'react';
+import React from 'react';
 import {
   Grid,
   Card,
@@ -18,32 +18,9 @@ import {
   Refresh,
   AttachMoney,
 } from '@mui/icons-material';
-import { getQuotes } from '../services/api';
-
-export default function PriceBoard({ tickers }) {
-  const [quotes, setQuotes] = useState([]);
-  const [loading, setLoading] = useState(false);
-  const [lastUpdated, setLastUpdated] = useState(null);
-
-  const fetchQuotes = useCallback(async () => {
-    setLoading(true);
-    try {
-      const data = await getQuotes(tickers);
-      setQuotes(data);
-      setLastUpdated(new Date());
-    } catch (err) {
-      console.error('Quotes error:', err);
-    } finally {
-      setLoading(false);
-    }
-  }, [tickers]);
-
-  useEffect(() => {
-    fetchQuotes();
-    const id = setInterval(fetchQuotes, 30_000); // Reduced to 30 seconds with backend caching
-    return () => clearInterval(id);
-  }, [fetchQuotes]);
 
+// Quotes are polled by App together with the prediction (one snapshot request)
+export default function PriceBoard({ quotes, loading, lastUpdated, onRefresh }) {
   const formatTime = (date) => {
     return date?.toLocaleTimeString('en-US', {
       hour12: true,
@@ -98,7 +75,7 @@ export default function PriceBoard({ tickers }) {
         </Box>
         <Tooltip title="Refresh Prices">
           <IconButton
-            onClick={fetchQuotes}
+            onClick={onRefresh}
             disabled={loading}
             sx={{
               color: '#00ff88',
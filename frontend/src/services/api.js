@@ -3,11 +3,50 @@ import axios from "axios";
 
 const API_URL = process.env.REACT_APP_API_URL || "http://localhost:5001";
 
-export async function getPrediction(ticker, window = 60) {
-  const { data } = await axios.post(`${API_URL}/api/predict`, {
-    ticker,
-    window,
-  });
+// Last prediction + ETag per request, so polls can revalidate with a 304
+const predictionCache = new Map();
+
+// intervalSamples > 0 adds an MC-dropout prediction interval ("interval")
+export async function getPrediction(
+  ticker,
+  window = 60,
+  horizon = 1,
+  intervalSamples = 0
+) {
+  const key = `${ticker}:${window}:${horizon}:${intervalSamples}`;
+  const cached = predictionCache.get(key);
+  const headers = cached ? { "If-None-Match": cached.etag } : {};
+
+  const response = await axios.post(
+    `${API_URL}/api/predict`,
+    {
+      ticker,
+      window,
+      horizon,
+      interval_samples: intervalSamples,
+      format: "columnar",
+    },
+    {
+      headers,
+      validateStatus: (s) => (s >= 200 && s < 300) || s === 304,
+    }
+  );
+
+  if (response.status === 304 && cached) {
+    return cached.data;
+  }
+
+  // Rebuild the row layout the components expect from the columnar arrays
+  const { dates = [], closes = [], ...rest } = response.data;
+  const data = {
+    ...rest,
+    history: dates.map((date, i) => ({ date, close: closes[i] })),
+  };
+
+  const etag = response.headers["etag"];
+  if (etag) {
+    predictionCache.set(key, { etag, data });
+  }
   return data;
 }
 
@@ -16,3 +55,38 @@ export async function getQuotes(tickers) {
   const { data } = await axios.post(`${API_URL}/api/quotes`, { tickers });
   return data;
 }
+
+// Dashboard snapshot: quotes + predictions in one request. The server only
+// returns items that changed since `version`, so merge them into the last
+// full state we saw (keeping only the tickers asked for this time).
+let snapshotState = { version: null, quotes: {}, predictions: {} };
+
+const pick = (items, tickers) =>
+  Object.fromEntries(
+    tickers.filter((t) => t in items).map((t) => [t, items[t]])
+  );
+
+export async function getSnapshot(tickers, predict = [], window = 60) {
+  const { data } = await axios.post(`${API_URL}/api/snapshot`, {
+    tickers,
+    predict,
+    window,
+    since: snapshotState.version,
+  });
+
+  const base = data.delta ? snapshotState : { quotes: {}, predictions: {} };
+  const quotes = { ...base.quotes };
+  data.quotes.forEach((q) => {
+    quotes[q.ticker] = q;
+  });
+  snapshotState = {
+    version: data.version,
+    quotes: pick(quotes, tickers),
+    predictions: pick({ ...base.predictions, ...data.predictions }, predict),
+  };
+
+  return {
+    quotes: tickers.map((t) => quotes[t]).filter(Boolean),
+    predictions: snapshotState.predictions,
+  };
+}